@@ -20,7 +20,7 @@ def build_application():
     # Define the paths relative to the base directory
     exec_icon = os.path.join(base_dir, "assets", "icon.ico")
     assets_icon = os.path.join(base_dir, "assets", "icon.png")
-    assets_landmarks = os.path.join(base_dir, "assets", "default_landmarks.pkl")
+    assets_landmarks = os.path.join(base_dir, "assets", "default_landmarks.npy")
     configs_dir = os.path.join(base_dir, "configs")
 
     # Define the base path for the neurablink environment
@@ -29,6 +29,12 @@ def build_application():
     # Find the mediapipe path within the neurablink environment
     mediapipe_path = find_mediapipe_path(neurablink_env_path)
 
+    # Hydra instantiates the classes named in the configs, which dist.py does not import directly
+    hidden_imports = [
+        f"--hidden-import={module}"
+        for module in ("utils.camera", "utils.detector", "utils.distribution", "utils.frame_processor", "utils.scheduler")
+    ]
+
     # Determine the operating system
     current_os = platform.system()
 
@@ -45,6 +51,7 @@ def build_application():
             f"--add-data={assets_landmarks};assets",
             f"--add-data={configs_dir};configs",
             f"--add-data={mediapipe_path};mediapipe",
+            *hidden_imports,
             os.path.join(base_dir, "src", "dist.py")
         ]
     elif current_os == "Linux":
@@ -58,6 +65,7 @@ def build_application():
             f"--add-data={assets_landmarks}:assets",
             f"--add-data={configs_dir}:configs",
             f"--add-data={mediapipe_path}:mediapipe",
+            *hidden_imports,
             os.path.join(base_dir, "src", "dist.py")
         ]
         # Note: Linux does not use the --icon option in the same way
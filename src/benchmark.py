@@ -0,0 +1,47 @@
+from utils.benchmark import BenchmarkRunner, SyntheticEyeLandmarksDetector, SyntheticFrameSource, VideoFrames, environment_info, peak_rss_mb, write_report
+from utils.detector import create_eye_detector
+from omegaconf import DictConfig, OmegaConf
+import hydra
+
+
+@hydra.main(version_base=None, config_path="../configs", config_name="benchmark")
+def main_benchmark(cfg: DictConfig):
+    if cfg.video_path:
+        # Recorded face video with the configured landmark detector
+        make_frames = lambda: VideoFrames(cfg.video_path, cfg.n_frames)
+        make_eye_detector = lambda: hydra.utils.instantiate(cfg.eye_detector)
+        # Alternative landmark backends, compared against the configured eye detector
+        make_backends = {
+            name: (lambda name=name: create_eye_detector(name, **cfg.landmarks_backends[name]))
+            for name in cfg.landmarks_backends
+        }
+    else:
+        # Synthetic blinking face with stubbed landmarks, runs on any machine without camera
+        source = SyntheticFrameSource(cfg.n_frames, cfg.frame_height, cfg.frame_width, cfg.blink_period, cfg.seed)
+        make_frames = lambda: source
+        make_eye_detector = lambda: SyntheticEyeLandmarksDetector(
+            cfg.frame_height, cfg.frame_width, cfg.blink_period, mask_size=cfg.eye_detector.mask_size
+        )
+        make_backends = None  # Real backends find no face in synthetic frames
+
+    runner = BenchmarkRunner(
+        make_frames=make_frames,
+        make_eye_detector=make_eye_detector,
+        make_calibrator=lambda: hydra.utils.instantiate(cfg.calibrator),
+        buffer_size=cfg.buffer_size,
+        warmup_frames=cfg.warmup_frames,
+        n_calibrator_samples=cfg.n_calibrator_samples,
+        seed=cfg.seed,
+        make_backends=make_backends
+    )
+    report = {
+        'config': OmegaConf.to_container(cfg, resolve=True),
+        'environment': environment_info(),
+        'results': runner.run(),
+        'peak_rss_mb': peak_rss_mb(),  # Whole benchmark, the memory of each run is in its results
+    }
+    write_report(report, cfg.output_path)
+
+
+if __name__ == "__main__":
+    main_benchmark()
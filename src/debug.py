@@ -1,3 +1,5 @@
+from utils.startup import startup_profiler
+startup_profiler.enable_from_argv()  # Before Hydra parses the command line
 from utils.main import main_func
 from omegaconf import DictConfig
 import hydra
@@ -5,8 +7,10 @@ import hydra
 
 @hydra.main(version_base=None, config_path="../configs", config_name="debug")
 def main_debug(cfg: DictConfig):
+    startup_profiler.mark('hydra compose')
     main_func(cfg)
 
 
 if __name__ == "__main__":
+    startup_profiler.mark('imports')
     main_debug()
\ No newline at end of file
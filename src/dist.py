@@ -1,18 +1,19 @@
-from utils.screen import *
-from utils.detector import *
-from utils.camera import *
-from utils.frame_processor import *
-from utils.widgets import *
+from utils.startup import startup_profiler
+startup_profiler.enable_from_argv()  # Before Hydra parses the command line
 from utils.distribution import bundled_path
 from utils.main import main_func
 from omegaconf import DictConfig
 import hydra
+import multiprocessing
 
 
 @hydra.main(version_base=None, config_path=bundled_path("configs"), config_name="dist")
 def main_dist(cfg: DictConfig):
+    startup_profiler.mark('hydra compose')
     main_func(cfg)
     
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Inference worker processes re-run the frozen executable
+    startup_profiler.mark('imports')
     main_dist()
\ No newline at end of file
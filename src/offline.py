@@ -0,0 +1,34 @@
+from functools import partial
+from utils.engine import BlinkEngine
+from utils.offline import ResultWriter, open_frame_source, process_offline
+from utils.parallel import InferencePool
+from omegaconf import DictConfig, OmegaConf, open_dict
+import hydra
+
+
+@hydra.main(version_base=None, config_path="../configs", config_name="offline")
+def main_offline(cfg: DictConfig):
+    if cfg.replay_landmarks:
+        # Recorded landmarks take inference out of the loop, results only depend on the blink detector
+        with open_dict(cfg):
+            cfg.blink_detector.module.eye_detector = {
+                '_target_': 'utils.detector.ReplayLandmarksDetector',
+                'recording_path': cfg.input_path,
+                'mask_size': cfg.blink_detector.module.eye_detector.mask_size,
+            }
+            cfg.n_workers = 0  # Workers would each replay the landmarks from the start
+    blink_detector = hydra.utils.instantiate(cfg.blink_detector)
+    engine = BlinkEngine(blink_detector)
+    source = open_frame_source(cfg.input_path, fps=cfg.fps)
+    writer = ResultWriter(cfg.output_path, max_feature_columns=cfg.max_feature_columns)
+    if cfg.n_workers > 0:
+        # Each worker process builds its own eye detector from the config
+        eye_detector_config = OmegaConf.to_container(cfg.blink_detector.module.eye_detector, resolve=True)
+        with InferencePool(partial(hydra.utils.instantiate, eye_detector_config), cfg.n_workers) as inference_pool:
+            process_offline(engine, source, writer, log_every=cfg.log_every, inference_pool=inference_pool)
+    else:
+        process_offline(engine, source, writer, log_every=cfg.log_every)
+
+
+if __name__ == "__main__":
+    main_offline()
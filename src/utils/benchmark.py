@@ -0,0 +1,359 @@
+import json
+import platform
+import sys
+import time
+import cv2
+import numpy as np
+from typing import Callable, Dict, Iterator, List, Optional
+from utils.detector import (
+    BaseCalibrator, BaseEyeLandmarksDetector, BufferedModule, ContinuousCalibrator, EyeAspectRatioBlinkDetector,
+    IntensityBlinkDetector, LatencyMeter, OneTimeCalibrator, PeriodicCalibrator, PixelBlinkDetector, RollingQuantileCalibrator,
+    SurfaceBlinkDetector, SymmetryBlinkDetector, UniformityBlinkDetector, VerticalDistanceBlinkDetector
+)
+
+DETECTORS = {
+    'intensity': IntensityBlinkDetector,
+    'symmetry': SymmetryBlinkDetector,
+    'surface': SurfaceBlinkDetector,
+    'pixel': PixelBlinkDetector,
+    'vertical_distance': VerticalDistanceBlinkDetector,
+    'eye_aspect_ratio': EyeAspectRatioBlinkDetector,
+    'uniformity': UniformityBlinkDetector,
+}
+
+BLINK_OPENNESS = [0.6, 0.25, 0.05, 0.25, 0.6]  # Eye openness during a synthetic blink
+
+
+def synthetic_eye_landmarks(index: int, height: int, width: int, blink_period: int) -> np.ndarray:
+    """
+    Eye landmarks of the synthetic face at a given frame index, in the FaceMesh point order.
+    The eyes blink once every blink_period frames.
+    """
+    phase = index % blink_period
+    openness = BLINK_OPENNESS[phase] if phase < len(BLINK_OPENNESS) else 1.0
+    half_width = width // 16
+    half_height = max(1, int(half_width * 0.45 * openness))
+    third = half_width // 3
+    contour = np.array([
+        (-half_width, 0), (-third, -half_height), (third, -half_height),
+        (half_width, 0), (third, half_height), (-third, half_height),
+    ], dtype=np.float32)
+    centers = np.array([(width * 3 // 8, height * 2 // 5), (width * 5 // 8, height * 2 // 5)], dtype=np.float32)
+    return centers[:, None] + contour
+
+
+class SyntheticFrameSource:
+    """
+    Deterministic sequence of frames showing a blinking synthetic face, for runs without a camera or video.
+    """
+    def __init__(self, n_frames: int, height: int = 480, width: int = 640, blink_period: int = 60, seed: int = 0) -> None:
+        self.n_frames = n_frames
+        self.height = height
+        self.width = width
+        self.blink_period = blink_period
+        rng = np.random.default_rng(seed)
+        self.background = rng.integers(120, 180, (height, width, 3), dtype=np.uint8)
+
+    def render(self, index: int) -> np.ndarray:
+        frame = self.background.copy()
+        landmarks = synthetic_eye_landmarks(index, self.height, self.width, self.blink_period)
+        for points in landmarks.astype(np.int32):
+            cv2.fillPoly(frame, [points], (230, 230, 230))
+            center = tuple(int(v) for v in points.mean(0))
+            radius = int(points[:, 1].max() - points[:, 1].min()) // 2
+            cv2.circle(frame, center, radius, (40, 30, 20), -1)
+        return frame
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for index in range(self.n_frames):
+            yield self.render(index)
+
+
+class SyntheticEyeLandmarksDetector(BaseEyeLandmarksDetector):
+    """
+    Stub landmark source returning the landmarks of SyntheticFrameSource.
+    Frames are assumed to arrive in order; the landmarks cache guarantees one call per frame.
+    """
+    def __init__(self, height: int, width: int, blink_period: int, mask_size: int = 16, cache_size: int = 2) -> None:
+        super().__init__(mask_size, cache_size)
+        self.height = height
+        self.width = width
+        self.blink_period = blink_period
+        self.frame_index = 0
+
+    def compute_eye_landmarks(self, frame: np.ndarray) -> np.ndarray:
+        landmarks = synthetic_eye_landmarks(self.frame_index, self.height, self.width, self.blink_period)
+        self.face_found = True
+        self.frame_index += 1
+        return landmarks
+
+
+class VideoFrames:
+    """
+    The first n_frames frames of a recorded video, re-read from disk for every benchmark.
+    """
+    def __init__(self, path: str, n_frames: int) -> None:
+        self.path = path
+        self.n_frames = n_frames
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        cap = cv2.VideoCapture(self.path)
+        if not cap.isOpened():
+            raise IOError(f"Could not open video file {self.path}.")
+        try:
+            for _ in range(self.n_frames):
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield frame
+        finally:
+            cap.release()
+
+
+class TimedCalibrator:
+    """
+    Forwards calls to a calibrator and records their latency.
+    """
+    def __init__(self, calibrator: BaseCalibrator, latencies: List[float]) -> None:
+        self.calibrator = calibrator
+        self.latencies = latencies
+
+    def __call__(self, changes: np.ndarray) -> float:
+        start = time.perf_counter()
+        threshold = self.calibrator(changes)
+        self.latencies.append(time.perf_counter() - start)
+        return threshold
+
+    def __getattr__(self, name):
+        return getattr(self.calibrator, name)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of the whole process so far in MB, None where unsupported (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10  # Bytes on macOS, KB on Linux
+
+
+def read_proc_status_mb(field: str) -> Optional[float]:
+    """Memory field of /proc/self/status (e.g. VmRSS or VmHWM) in MB, None where unavailable (not Linux)."""
+    try:
+        with open('/proc/self/status') as file:
+            for line in file:
+                if line.startswith(f'{field}:'):
+                    return int(line.split()[1]) / 2 ** 10  # KB
+    except OSError:
+        pass
+    return None
+
+
+class RunMemory:
+    """
+    Resident memory of one benchmark run, created at its start. The process peak (ru_maxrss) only grows
+    over the whole benchmark, so on Linux the peak (VmHWM) is reset through /proc/self/clear_refs
+    and read back at the end of the run. Elsewhere the per-run values are None.
+    """
+    def __init__(self) -> None:
+        self.start_rss_mb = read_proc_status_mb('VmRSS')
+        try:
+            with open('/proc/self/clear_refs', 'w') as file:
+                file.write('5')  # Resets VmHWM to the current RSS
+            self.peak_reset = True
+        except OSError:
+            self.peak_reset = False
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        peak = read_proc_status_mb('VmHWM') if self.peak_reset else None
+        return {
+            'start_rss_mb': self.start_rss_mb,
+            'peak_rss_mb': peak,
+            'peak_rss_increase_mb': peak - self.start_rss_mb if peak is not None and self.start_rss_mb is not None else None,
+        }
+
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, float]:
+    """Latency statistics in milliseconds."""
+    if not latencies:
+        return {}
+    samples = np.array(latencies) * 1000
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+    return {
+        'mean': float(samples.mean()), 'p50': float(p50), 'p90': float(p90),
+        'p99': float(p99), 'max': float(samples.max()), 'count': int(samples.size),
+    }
+
+
+def summarize_run(stage_latencies: Dict[str, List[float]], n_frames: int, elapsed: float, memory: RunMemory) -> dict:
+    return {
+        'frames': n_frames,
+        'frames_per_sec': n_frames / elapsed if elapsed > 0 else None,
+        'latency_ms': {stage: summarize_latencies(samples) for stage, samples in stage_latencies.items()},
+        'memory': memory.summary(),
+    }
+
+
+class BenchmarkRunner:
+    """
+    Replays a fixed frame sequence through every detector, calibrator and the full frame processing path.
+    make_frames returns a fresh iterable over the same frames; make_eye_detector returns a new landmark source.
+    make_backends optionally maps names to factories of alternative landmark backends to compare against it.
+    """
+    def __init__(
+            self,
+            make_frames: Callable[[], Iterator[np.ndarray]],
+            make_eye_detector: Callable[[], BaseEyeLandmarksDetector],
+            make_calibrator: Callable[[], BaseCalibrator],
+            buffer_size: int,
+            warmup_frames: int,
+            n_calibrator_samples: int,
+            seed: int,
+            make_backends: Optional[Dict[str, Callable[[], BaseEyeLandmarksDetector]]] = None
+            ) -> None:
+        self.make_frames = make_frames
+        self.make_eye_detector = make_eye_detector
+        self.make_calibrator = make_calibrator
+        self.buffer_size = buffer_size
+        self.warmup_frames = warmup_frames
+        self.n_calibrator_samples = n_calibrator_samples
+        self.seed = seed
+        self.make_backends = make_backends or {}
+
+    def run_detector(self, detector_class) -> dict:
+        memory = RunMemory()
+        eye_detector = self.make_eye_detector()
+        calibrator_latencies: List[float] = []
+        calibrator = TimedCalibrator(self.make_calibrator(), calibrator_latencies)
+        blink_detector = BufferedModule(detector_class(eye_detector, calibrator), self.buffer_size)
+        stages: Dict[str, List[float]] = {'landmarks': [], 'features': [], 'calibration': calibrator_latencies, 'total': []}
+
+        n_frames, elapsed, n_blinks = 0, 0.0, 0
+        for index, frame in enumerate(self.make_frames()):
+            if index == self.warmup_frames:
+                for samples in stages.values():
+                    samples.clear()
+            start = time.perf_counter()
+            eye_detector.get_eye_landmarks(frame)
+            landmarks_done = time.perf_counter()
+            n_calls = len(calibrator_latencies)
+            is_blink = blink_detector(frame)
+            done = time.perf_counter()
+            calibration_time = sum(calibrator_latencies[n_calls:])
+            stages['landmarks'].append(landmarks_done - start)
+            stages['features'].append(done - landmarks_done - calibration_time)
+            stages['total'].append(done - start)
+            if index >= self.warmup_frames:
+                n_frames += 1
+                elapsed += done - start
+                n_blinks += bool(is_blink)
+        summary = summarize_run(stages, n_frames, elapsed, memory)
+        summary['blink_frames'] = n_blinks
+        return summary
+
+    def run_calibrator(self, calibrator: BaseCalibrator) -> dict:
+        memory = RunMemory()
+        changes = np.random.default_rng(self.seed).exponential(size=self.n_calibrator_samples)
+        latencies: List[float] = []
+        for value in changes:
+            start = time.perf_counter()
+            calibrator(np.float64(value))
+            latencies.append(time.perf_counter() - start)
+        return summarize_run({'calibration': latencies}, len(latencies), sum(latencies), memory)
+
+    def run_frame_processor(self, detector_class) -> dict:
+        """Detection plus preview rendering as done by FrameProcessor, without the Qt event loop."""
+        try:
+            from types import SimpleNamespace
+            from utils.frame_processor import FrameProcessor
+        except ImportError as e:
+            return {'skipped': f"PyQt6 is not available: {e}"}
+        memory = RunMemory()
+        eye_detector = self.make_eye_detector()
+        blink_detector = BufferedModule(detector_class(eye_detector, self.make_calibrator()), self.buffer_size)
+        frame_processor = FrameProcessor(
+            blink_detector=blink_detector, cap=None, app=None, control_window=None,
+            camera_manager=SimpleNamespace(fps=30.0), frame_queue=None,
+            preview_fps=float('inf')  # Render a preview for every frame
+        )
+        stages: Dict[str, List[float]] = {'total': []}
+        n_frames, elapsed = 0, 0.0
+        for index, frame in enumerate(self.make_frames()):
+            start = time.perf_counter()
+            frame_processor.process_frame(frame)
+            frame_processor.preview_consumed()  # Act as a GUI that always keeps up
+            done = time.perf_counter()
+            if index >= self.warmup_frames:
+                stages['total'].append(done - start)
+                n_frames += 1
+                elapsed += done - start
+        return summarize_run(stages, n_frames, elapsed, memory)
+
+    def run_backend(self, make_backend: Callable[[], BaseEyeLandmarksDetector], reference: List[np.ndarray]) -> dict:
+        """
+        Per-frame latency of a landmarks backend, as reported by the backend itself,
+        and the distance in pixels of its eye centers to those of the reference eye detector.
+        """
+        memory = RunMemory()  # Includes building the backend
+        eye_detector = make_backend()
+        eye_detector.latency = LatencyMeter(window=None)
+        errors = []
+        for frame, reference_centers in zip(self.make_frames(), reference):
+            centers = eye_detector.get_eye_landmarks(frame).mean(1)
+            errors.append(np.linalg.norm(centers - reference_centers, axis=1).max())
+        latencies = list(eye_detector.latency.samples)[self.warmup_frames:]
+        summary = summarize_run({'landmarks': latencies}, len(latencies), sum(latencies), memory)
+        errors = np.array(errors[self.warmup_frames:])
+        summary['eye_center_error_px'] = {
+            'mean': float(errors.mean()), 'p90': float(np.percentile(errors, 90)), 'max': float(errors.max()),
+        } if errors.size else {}
+        return summary
+
+    def run(self) -> dict:
+        results = {'detectors': {}, 'calibrators': {}, 'frame_processor': {}, 'landmarks_backends': {}}
+        for name, detector_class in DETECTORS.items():
+            print(f"Benchmarking detector {name}...")
+            results['detectors'][name] = self.run_detector(detector_class)
+
+        calibrators = {
+            'one_time': lambda: OneTimeCalibrator(buffer_size=200, quantile=0.97),
+            'periodic': lambda: PeriodicCalibrator(every_nth_frame=1000, buffer_size=200, quantile=0.97),
+            'continuous': lambda: ContinuousCalibrator(buffer_size=200, quantile=0.97),
+            'rolling_quantile': lambda: RollingQuantileCalibrator(buffer_size=200, quantile=0.97),
+        }
+        for name, make_calibrator in calibrators.items():
+            print(f"Benchmarking calibrator {name}...")
+            results['calibrators'][name] = self.run_calibrator(make_calibrator())
+
+        print("Benchmarking frame processor...")
+        results['frame_processor']['vertical_distance'] = self.run_frame_processor(VerticalDistanceBlinkDetector)
+
+        if self.make_backends:
+            reference_detector = self.make_eye_detector()
+            reference = [reference_detector.get_eye_landmarks(frame).mean(1) for frame in self.make_frames()]
+            for name, make_backend in self.make_backends.items():
+                print(f"Benchmarking landmarks backend {name}...")
+                results['landmarks_backends'][name] = self.run_backend(make_backend, reference)
+        return results
+
+
+def environment_info() -> dict:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+    }
+
+
+def write_report(report: dict, output_path: Optional[str]) -> None:
+    """Write the report as JSON to output_path, or to stdout if no path is given."""
+    text = json.dumps(report, indent=2)
+    if output_path:
+        with open(output_path, 'w') as f:
+            f.write(text)
+        print(f"Benchmark results written to {output_path}")
+    else:
+        print(text)
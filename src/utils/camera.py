@@ -1,6 +1,149 @@
 from PyQt6 import QtWidgets, QtGui, QtCore
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import threading
+import queue
+import json
+import time
 import cv2
 import sys
+import os
+import re
+from .distribution import user_cache_path
+from .instrumentation import instrumentation
+from .recording import ReplayCapture
+
+
+CAPTURE_BACKENDS = {
+    'any': cv2.CAP_ANY,
+    'v4l2': cv2.CAP_V4L2,
+    'ffmpeg': cv2.CAP_FFMPEG,
+    'gstreamer': cv2.CAP_GSTREAMER,
+    'dshow': cv2.CAP_DSHOW,
+    'msmf': cv2.CAP_MSMF,
+    'avfoundation': cv2.CAP_AVFOUNDATION,
+}
+AUTO_RESOLUTIONS = [(320, 240), (640, 360), (640, 480), (960, 540), (1280, 720), (1920, 1080)]  # Tried in order
+
+
+class CaptureSettings:
+    """
+    Requested capture format of the camera, unset values keep the driver defaults.
+    Drivers pick the closest format they support, so the negotiated one has to be read back after opening.
+    With auto_resolution, the lowest resolution at which the eye landmarks are stable is selected instead of width and height.
+    With replay_path, a recording made by SessionRecorder is played back instead of opening a camera.
+    """
+    def __init__(
+            self,
+            width: Optional[int] = None,
+            height: Optional[int] = None,
+            fps: Optional[float] = None,
+            fourcc: Optional[str] = None,
+            backend: str = 'any',
+            auto_resolution: bool = False,
+            min_eye_width: float = 24.0,
+            max_jitter: float = 0.1,
+            auto_frames: int = 10,
+            replay_path: Optional[str] = None,
+            replay_realtime: bool = True,
+            replay_loop: bool = False
+            ) -> None:
+        if backend not in CAPTURE_BACKENDS:
+            raise ValueError(f"Unknown capture backend {backend}, available: {', '.join(CAPTURE_BACKENDS)}.")
+        if fourcc is not None and len(fourcc) != 4:
+            raise ValueError(f"FOURCC must have 4 characters, got {fourcc}.")
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fourcc = fourcc  # Pixel format, e.g. MJPG or YUYV
+        self.backend = backend
+        self.auto_resolution = auto_resolution
+        self.min_eye_width = min_eye_width  # Pixels, smaller eyes give noisy landmarks
+        self.max_jitter = max_jitter  # Tolerated frame to frame jitter of the eye centers, relative to the eye width
+        self.auto_frames = auto_frames  # Frames inspected per resolution in auto mode
+        self.replay_path = replay_path
+        self.replay_realtime = replay_realtime  # Pace the replay by the recorded timestamps, like a camera
+        self.replay_loop = replay_loop  # Start over at the end of the recording instead of ending the stream
+
+    def create(self):
+        """Return an unopened capture, or the replay of the recording if replay_path is set."""
+        if self.replay_path:
+            return ReplayCapture(self.replay_path, realtime=self.replay_realtime, loop=self.replay_loop)
+        return cv2.VideoCapture()
+
+    def open(self, cap: cv2.VideoCapture, camera_index: int) -> bool:
+        """(Re)open a camera with the requested backend and apply the requested format."""
+        if not cap.open(camera_index, CAPTURE_BACKENDS[self.backend]):
+            return False
+        self.apply(cap)
+        return True
+
+    def apply(self, cap: cv2.VideoCapture, width: Optional[int] = None, height: Optional[int] = None) -> None:
+        """Request the configured format, or the given frame size instead of the configured one."""
+        # Pixel format first, V4L2 resets the frame size and rate when it changes
+        if self.fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        width, height = width or self.width, height or self.height
+        if width:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height:
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if self.fps:
+            cap.set(cv2.CAP_PROP_FPS, self.fps)
+
+    def select_resolution(self, cap: cv2.VideoCapture, eye_detector) -> Tuple[int, int]:
+        """
+        Apply the lowest of AUTO_RESOLUTIONS at which the face is found in every test frame, the eyes are
+        at least min_eye_width pixels wide and their landmarks are stable. Falls back to the largest one.
+        Returns the negotiated resolution.
+        """
+        tried = set()
+        resolution = None
+        for width, height in AUTO_RESOLUTIONS:
+            self.apply(cap, width, height)
+            resolution = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            if resolution in tried:
+                continue  # Driver snapped to an already tested resolution
+            tried.add(resolution)
+            if self.landmarks_are_stable(cap, eye_detector):
+                return resolution
+        return resolution
+
+    def landmarks_are_stable(self, cap: cv2.VideoCapture, eye_detector) -> bool:
+        for _ in range(2):  # Let the stream and the landmark tracking settle at the new format
+            ret, frame = cap.read()
+            if ret:
+                eye_detector.get_eye_landmarks(frame)
+        centers, widths = [], []
+        for _ in range(self.auto_frames):
+            ret, frame = cap.read()
+            if not ret:
+                return False
+            landmarks = eye_detector.get_eye_landmarks(frame)
+            if not eye_detector.face_found:
+                return False
+            centers.append(landmarks.mean(1))
+            widths.append(np.ptp(landmarks[..., 0], axis=1))
+        # Jitter as the second difference of the eye centers, which smooth head motion hardly contributes to
+        jitter = np.abs(np.diff(np.array(centers), n=2, axis=0)).max(-1)
+        eye_width = np.mean(widths)
+        return eye_width >= self.min_eye_width and np.median(jitter) <= self.max_jitter * eye_width
+
+
+def read_capture_format(cap: cv2.VideoCapture) -> Dict[str, object]:
+    """Return the format actually negotiated with the camera."""
+    fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+    try:
+        backend = cap.getBackendName()
+    except cv2.error:
+        backend = None
+    return {
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'fps': cap.get(cv2.CAP_PROP_FPS),
+        'fourcc': ''.join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)) if fourcc > 0 else None,
+        'backend': backend,
+    }
 
 
 class CameraManager(QtCore.QThread):
@@ -9,17 +152,28 @@ class CameraManager(QtCore.QThread):
     """
     camera_changed = QtCore.pyqtSignal(bool)
 
-    def __init__(self, cap: cv2.VideoCapture, app: QtWidgets.QApplication) -> None:
+    def __init__(
+            self,
+            cap: cv2.VideoCapture,
+            app: QtWidgets.QApplication,
+            capture_settings: Optional[CaptureSettings] = None,
+            eye_detector=None
+            ) -> None:
         super().__init__()
         self.cap = cap
         self.app = app
-        self.fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap else None
+        self.capture_settings = capture_settings or CaptureSettings()
+        self.eye_detector = eye_detector  # Used to select the resolution in auto mode
+        self.capture_format = read_capture_format(self.cap) if self.cap else None  # Negotiated format
+        self.fps = self.capture_format['fps'] if self.capture_format else None
         self.camera_index = None
+        self.lock = threading.Lock()  # Guards cap against concurrent reads while (re)opening
 
     def stop(self):
         """Release the camera and perform cleanup."""
-        if self.cap.isOpened():
-            self.cap.release()
+        with self.lock:
+            if self.cap.isOpened():
+                self.cap.release()
         self.quit()  # Stop the QThread
         self.wait()  # Wait for the thread to finish
         
@@ -33,14 +187,21 @@ class CameraManager(QtCore.QThread):
 
     def run(self):
         """Perform the camera change operation."""
-        if self.cap.isOpened():
-            self.cap.release()
-        success = self.cap.open(self.camera_index)
+        with self.lock:
+            if self.cap.isOpened():
+                self.cap.release()
+            success = self.capture_settings.open(self.cap, self.camera_index)
+            if success and self.capture_settings.auto_resolution and self.eye_detector is not None:
+                # change() paused frame processing and waited for the current frame, so the detector is not used concurrently
+                self.capture_settings.select_resolution(self.cap, self.eye_detector)
         self.camera_changed.emit(success)
 
     def on_camera_changed(self, success):
         """Handle the result of the camera change."""
-        self.fps = self.cap.get(cv2.CAP_PROP_FPS) if success else None
+        self.capture_format = read_capture_format(self.cap) if success else None
+        self.fps = self.capture_format['fps'] if success else None
+        if success:
+            print(f"Camera format: {format_capture(self.capture_format)}")
         if not success:
             print(f"Error: Could not access camera {self.camera_index}.")
             self.stop()
@@ -50,10 +211,217 @@ class CameraManager(QtCore.QThread):
                 self.control_window.camera_feed.hide_initial_message()  # Hide initializing message
 
 
+def format_capture(capture_format: Dict[str, object]) -> str:
+    return (
+        f"{capture_format['width']}x{capture_format['height']} at {capture_format['fps']:g} fps, "
+        f"{capture_format['fourcc'] or 'unknown format'} via {capture_format['backend'] or 'unknown backend'}"
+    )
+
+
+MAX_CAMERAS = 5  # Camera indices probed when the devices cannot be listed
+V4L2_SYSFS_DIR = '/sys/class/video4linux'
+
+
+def list_v4l2_cameras(sysfs_dir: str = V4L2_SYSFS_DIR) -> Optional[List[Tuple[int, str]]]:
+    """
+    List the V4L2 capture devices as (index, name) pairs from their sysfs metadata, without opening them.
+    Returns None where V4L2 is not available, e.g. on Windows or macOS.
+    """
+    if not os.path.isdir(sysfs_dir):
+        return None
+    cameras = []
+    for entry in os.listdir(sysfs_dir):
+        match = re.fullmatch(r'video(\d+)', entry)
+        if match is None:
+            continue
+        try:
+            with open(os.path.join(sysfs_dir, entry, 'index')) as file:
+                if file.read().strip() != '0':
+                    continue  # Extra nodes of a device, e.g. the metadata node of UVC cameras
+            with open(os.path.join(sysfs_dir, entry, 'name')) as file:
+                name = file.read().strip()
+        except OSError:
+            continue  # Device unplugged while listing
+        cameras.append((int(match.group(1)), name))
+    return sorted(cameras)
+
+
+def probe_camera(index: int) -> bool:
+    """Return whether the camera at index can be opened and delivers a frame."""
+    cap = cv2.VideoCapture(index)
+    try:
+        return cap.isOpened() and cap.read()[0]
+    finally:
+        cap.release()
+
+
+class CameraDiscovery(QtCore.QObject):
+    """
+    Finds the available cameras in the background and reports them as they are found, without blocking the GUI.
+    On Linux the devices are listed from their V4L2 metadata, elsewhere indices 1 to max_cameras - 1 are opened
+    in parallel. Camera 0 is opened by the application at startup and is not probed.
+    The cameras found are cached on disk with a signature of the device list, so the combo box is filled
+    at once on the next start. Without a device list (not Linux) the cached cameras are shown until probing ends.
+    """
+    camera_found = QtCore.pyqtSignal(int, str)  # Camera index and name, empty if unknown
+    finished = QtCore.pyqtSignal(list)  # Indices of all cameras found
+
+    def __init__(self, max_cameras: int = MAX_CAMERAS, cache_file: str = 'cameras.json') -> None:
+        super().__init__()
+        self.max_cameras = max_cameras
+        self.cache_file = cache_file
+
+    def cached_cameras(self) -> List[Tuple[int, str]]:
+        """Cameras found on the last run, empty if the device list changed since."""
+        try:
+            with open(user_cache_path(self.cache_file)) as file:
+                cache = json.load(file)
+            cameras = [(int(index), str(name)) for index, name in cache['cameras']]
+        except (OSError, ValueError, KeyError, TypeError):
+            return []
+        signature = self.device_signature()
+        if signature is not None and cache.get('signature') != signature:
+            return []
+        return cameras
+
+    def save_cache(self, cameras: List[Tuple[int, str]]) -> None:
+        try:
+            path = user_cache_path(self.cache_file)
+            with open(path + '.tmp', 'w') as file:
+                json.dump({'signature': self.device_signature(), 'cameras': cameras}, file)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            pass  # The cache only speeds up the next start
+
+    def device_signature(self) -> Optional[List[List[str]]]:
+        """Device nodes and the hardware behind them, None where they cannot be listed."""
+        if not os.path.isdir(V4L2_SYSFS_DIR):
+            return None
+        return sorted(
+            [entry, os.path.realpath(os.path.join(V4L2_SYSFS_DIR, entry))]
+            for entry in os.listdir(V4L2_SYSFS_DIR)
+        )
+
+    def start(self) -> None:
+        # Daemon thread, a camera stuck while opening must not keep the application from exiting
+        threading.Thread(target=self.run, name='CameraDiscovery', daemon=True).start()
+
+    def run(self) -> None:
+        cameras = list_v4l2_cameras()
+        if cameras is None:
+            cameras = self.probe_cameras()
+        else:
+            for index, name in cameras:
+                self.report(self.camera_found, index, name)
+        self.save_cache(cameras)
+        self.report(self.finished, [index for index, _ in cameras])
+
+    def probe_cameras(self) -> List[Tuple[int, str]]:
+        """Open indices 1 to max_cameras - 1 in parallel threads and report each camera as soon as it answers."""
+        results: queue.Queue = queue.Queue()
+        indices = range(1, self.max_cameras)
+        for index in indices:
+            threading.Thread(target=lambda index=index: results.put((index, probe_camera(index))), daemon=True).start()
+        cameras = []
+        for _ in indices:
+            index, found = results.get()
+            if found:
+                cameras.append((index, ''))  # Name unknown without device metadata
+                self.report(self.camera_found, index, '')
+        return sorted(cameras)
+
+    @staticmethod
+    def report(signal, *args) -> None:
+        try:
+            signal.emit(*args)
+        except RuntimeError:
+            pass  # The GUI was closed during discovery
+
+
+class LatestFrameQueue:
+    """
+    Single-slot queue between frame capture and frame processing.
+    A new frame replaces the one still waiting, so a slow consumer always gets
+    the most recent frame and stalled frames are dropped instead of queued.
+    With lossless, put() waits for the waiting frame to be consumed instead, e.g. to replay every recorded frame.
+    """
+    def __init__(self, lossless: bool = False) -> None:
+        self.condition = threading.Condition()
+        self.frame: Optional[np.ndarray] = None
+        self.lossless = lossless
+        self.dropped_frames = 0
+
+    def put(self, frame: np.ndarray, timeout: Optional[float] = None) -> bool:
+        """
+        Store a frame, dropping the previous one if it was not consumed yet. In lossless mode, wait up to
+        timeout seconds for it to be consumed instead, and return False without storing the frame on timeout.
+        """
+        with self.condition:
+            if self.lossless and not self.condition.wait_for(lambda: self.frame is None, timeout):
+                return False
+            if self.frame is not None:
+                self.dropped_frames += 1
+                instrumentation.count('frames_dropped')
+            self.frame = frame
+            self.condition.notify_all()
+            return True
+
+    def get(self, timeout: float) -> Optional[np.ndarray]:
+        """Return the latest frame, or None if no frame arrived within timeout seconds."""
+        with self.condition:
+            if self.frame is None:
+                self.condition.wait(timeout)
+            frame, self.frame = self.frame, None
+            self.condition.notify_all()  # Wakes a lossless put()
+            return frame
+
+
+class FrameGrabber(QtCore.QThread):
+    """
+    Thread reading frames from the camera into a LatestFrameQueue.
+    """
+    read_failed = QtCore.pyqtSignal()
+
+    def __init__(self, camera_manager: CameraManager, frame_queue: LatestFrameQueue) -> None:
+        super().__init__()
+        self.camera_manager = camera_manager
+        self.frame_queue = frame_queue
+        self.running = False
+
+    def run(self):
+        """Read frames until stopped. Reads wait while the camera manager reopens the camera."""
+        self.running = True
+        while self.running:
+            with self.camera_manager.lock:
+                is_opened = self.camera_manager.cap.isOpened()
+                if is_opened:
+                    with instrumentation.stage('capture_read'):
+                        ret, frame = self.camera_manager.cap.read()
+            if not is_opened:
+                time.sleep(0.05)  # Camera is being changed or was released
+                continue
+            if not ret:
+                print("Error: Failed to read from the camera.")
+                self.running = False
+                self.read_failed.emit()
+                return
+            frame.flags.writeable = False  # Shared by detection, preview and recording, none of them may modify it
+            while not self.frame_queue.put(frame, timeout=0.1):
+                if not self.running:
+                    return
+
+    def stop(self):
+        """Stop reading frames and wait for the thread to finish."""
+        self.running = False
+        self.wait()
+
+
 class CameraFeed(QtWidgets.QWidget):
     """
     Widget to display the camera feed in the application.
     """
+    resized = QtCore.pyqtSignal(int, int)  # New size in device pixels
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setMinimumSize(320, 240)  # Adjust size as needed
@@ -61,6 +429,8 @@ class CameraFeed(QtWidgets.QWidget):
         # Camera feed label
         self.camera_label = QtWidgets.QLabel()
         self.camera_label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        # Previews follow the widget size, they must not keep the window from shrinking
+        self.camera_label.setSizePolicy(QtWidgets.QSizePolicy.Policy.Ignored, QtWidgets.QSizePolicy.Policy.Ignored)
 
         # Initial message widget
         self.message_widget = QtWidgets.QWidget()
@@ -118,18 +488,22 @@ class CameraFeed(QtWidgets.QWidget):
         self.dots_label.hide()
         self.stack_layout.setCurrentIndex(1)  # Show camera_label
        
-    def update_camera_feed(self, frame):
-        """Update the camera feed with the new frame."""
+    def update_camera_feed(self, q_image):
+        """Update the camera feed with the new preview image."""
         # Display the camera feed only if the initializing message is hidden
         if self.stack_layout.currentIndex() != 1:
             self.hide_initial_message()  # Stop animation once camera feed is ready
 
-        # Convert frame to QImage
-        height, width, channel = frame.shape
-        bytes_per_line = 3 * width
-        q_image = QtGui.QImage(frame.data, width, height, bytes_per_line, QtGui.QImage.Format.Format_RGB888)
-        
-        # Convert to QPixmap and scale to fit the label
+        # The preview is rendered at the size of the label in device pixels
         pixmap = QtGui.QPixmap.fromImage(q_image)
-        scaled_pixmap = pixmap.scaled(self.size(), QtCore.Qt.AspectRatioMode.KeepAspectRatio)
-        self.camera_label.setPixmap(scaled_pixmap)
\ No newline at end of file
+        pixmap.setDevicePixelRatio(self.devicePixelRatioF())
+        self.camera_label.setPixmap(pixmap)
+
+    def preview_size(self):
+        """Size of the camera feed in device pixels, for rendering the preview."""
+        ratio = self.devicePixelRatioF()
+        return max(1, round(self.width() * ratio)), max(1, round(self.height() * ratio))
+
+    def resizeEvent(self, event):
+        self.resized.emit(*self.preview_size())
+        super().resizeEvent(event)
\ No newline at end of file
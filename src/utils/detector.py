@@ -1,90 +1,610 @@
 import cv2
 import numpy as np
-import mediapipe as mp
-import pickle
-from PyQt6.QtCore import QObject, pyqtSignal
-from typing import Callable, Dict, List, Optional, Tuple
-import copy
+import os
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple, Type
+from utils.instrumentation import instrumentation
+from utils.recording import RecordingReader, replay_frame_numbers
+from utils.startup import startup_profiler
+
+
+class LandmarksCache:
+    """
+    Small LRU cache of landmark results keyed by frame identity.
+    Each entry keeps a reference to its frame, so the key cannot be reused
+    by another array while the entry is alive.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.entries: "OrderedDict[int, Tuple[np.ndarray, Any]]" = OrderedDict()
+
+    def get(self, frame: np.ndarray) -> Optional[Any]:
+        entry = self.entries.get(id(frame))
+        if entry is None or entry[0] is not frame:
+            return None
+        self.entries.move_to_end(id(frame))
+        return entry[1]
+
+    def put(self, frame: np.ndarray, value: Any) -> None:
+        self.entries[id(frame)] = (frame, value)
+        self.entries.move_to_end(id(frame))
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+class LatencyMeter:
+    """
+    Landmark computation time per frame over a sliding window of frames.
+    Time measured several times for the same frame is added up, nested measurements are ignored.
+    """
+
+    def __init__(self, window: Optional[int] = 100) -> None:
+        self.samples: Deque[float] = deque(maxlen=window)  # Seconds per frame, all frames if window is None
+        self.n_frames = 0
+        self.last_frame: Optional[np.ndarray] = None
+        self.depth = 0
+
+    @contextmanager
+    def measure(self, frame: np.ndarray) -> Iterator[None]:
+        self.depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            if self.depth == 0:
+                self.add(frame, time.perf_counter() - start)
+
+    def add(self, frame: np.ndarray, seconds: float) -> None:
+        if self.samples and frame is self.last_frame:
+            self.samples[-1] += seconds
+            return
+        self.samples.append(seconds)
+        self.last_frame = frame
+        self.n_frames += 1
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """Latency statistics of the window in milliseconds, None before the first frame."""
+        if not self.samples:
+            return {'frames': 0, 'last_ms': None, 'mean_ms': None, 'p90_ms': None}
+        samples = np.array(self.samples) * 1000
+        return {
+            'frames': self.n_frames, 'last_ms': float(samples[-1]),
+            'mean_ms': float(samples.mean()), 'p90_ms': float(np.percentile(samples, 90)),
+        }
+
+
+EYE_SIDES = {'left': 0, 'right': 1}  # Index of each eye in the eye landmarks array
 
-class BaseEyeLandmarksDetector:
-
-    def get_eye_landmarks(self, frame: np.ndarray) -> Dict[str, List[Tuple[int, int]]]:
-        raise NotImplementedError
 
-    def create_eye_mask(self, frame: np.ndarray, side: str = 'left+right') -> np.ndarray:
+class BaseEyeLandmarksDetector:
+    """
+    Eye landmarks are returned as a float32 array of shape (2, n_points, 2):
+    left and right eye, points of the eye contour, (x, y) in pixels.
+    Subclasses declared with a backend name, e.g. class X(BaseEyeLandmarksDetector, backend='x'),
+    are registered in backends and can be created with create_eye_detector.
+    Every backend reports its per-frame latency through the latency attribute.
+    """
+    backends: Dict[str, Type['BaseEyeLandmarksDetector']] = {}
+    provides_face_mesh = False  # Whether get_landmarks returns arbitrary FaceMesh landmarks
+
+    def __init_subclass__(cls, backend: Optional[str] = None, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        if backend is not None:
+            BaseEyeLandmarksDetector.backends[backend] = cls
+
+    def __init__(self, mask_size: int = 16, cache_size: int = 2) -> None:
+        self.mask_size = mask_size
+        self.landmarks_cache = LandmarksCache(cache_size)
+        self.mask_buffers: Dict[str, np.ndarray] = {}  # Local eye masks, reused across frames
+        self.latency = LatencyMeter()
+        self.face_found = False  # Whether the last inference found the face, previous landmarks are reused otherwise
+
+    def get_eye_landmarks(self, frame: np.ndarray) -> np.ndarray:
+        """Return the eye landmarks of a frame, running inference at most once per frame."""
+        landmarks = self.landmarks_cache.get(frame)
+        if landmarks is None:
+            with self.latency.measure(frame), instrumentation.stage('landmarks'):
+                landmarks = self.compute_eye_landmarks(frame)
+            self.landmarks_cache.put(frame, landmarks)
+        return landmarks
+
+    def set_eye_landmarks(self, frame: np.ndarray, landmarks: np.ndarray) -> None:
+        """Provide the landmarks of a frame without running inference, e.g. to reuse those of a previous frame."""
+        self.landmarks_cache.put(frame, landmarks)
+
+    def compute_eye_landmarks(self, frame: np.ndarray) -> np.ndarray:
         raise NotImplementedError
 
-
-class FaceMeshLandmarksDetector(BaseEyeLandmarksDetector):
+    def warm_up(self) -> None:
+        """Pay one-off initialization costs before the first real frame. Nothing to do for most backends."""
+
+    def get_frame_landmarks(self, frame: np.ndarray) -> Any:
+        """Return everything the backend infers from a frame, e.g. to hand it to another instance."""
+        return self.get_eye_landmarks(frame)
+
+    def set_frame_landmarks(self, frame: np.ndarray, landmarks: Any, face_found: bool = True) -> None:
+        """
+        Provide the result of get_frame_landmarks of another instance for a frame, without running inference,
+        with the face_found of that instance.
+        """
+        self.record_face_found(face_found)
+        self.set_eye_landmarks(frame, landmarks)
+
+    def record_face_found(self, face_found: bool) -> None:
+        """Set face_found for the latest frame and count the frames without face."""
+        self.face_found = face_found
+        if not face_found:
+            instrumentation.count('face_not_found')
+
+    def create_eye_region(self, frame: np.ndarray, side: str) -> 'EyeRegion':
+        """
+        Return the eye polygon of one side ('left' or 'right') as a bounding box and a mask local to it.
+        The mask lives in a buffer reused across frames and is only valid until the next call for the same side.
+        """
+        landmarks = self.get_eye_landmarks(frame)
+        return self.create_polygon_region(landmarks[EYE_SIDES[side]], frame.shape, side)
+
+    def create_polygon_region(self, points: np.ndarray, shape: Tuple[int, ...], buffer_key: str) -> 'EyeRegion':
+        """
+        Return the polygon given by (x, y) points as a bounding box clipped to an image of the given shape
+        and a mask local to it, drawn in the reused mask buffer named buffer_key.
+        """
+        points = points.astype(np.int32)
+        height, width = shape[:2]
+        x0, y0 = np.maximum(points.min(0), 0)
+        x1, y1 = np.minimum(points.max(0) + 1, (width, height))
+        box_height, box_width = max(0, y1 - y0), max(0, x1 - x0)
+
+        buffer = self.mask_buffers.get(buffer_key)
+        if buffer is None or buffer.shape[0] < box_height or buffer.shape[1] < box_width:
+            buffer = np.zeros((max(box_height, 64), max(box_width, 64)), dtype=np.uint8)
+            self.mask_buffers[buffer_key] = buffer
+        mask = buffer[:box_height, :box_width]
+        mask[:] = 0
+        cv2.fillPoly(mask, [points - (x0, y0)], 1)
+        return EyeRegion(slice(y0, y0 + box_height), slice(x0, x0 + box_width), mask.view(bool))
+
+    def eye_center_patch(self, frame: np.ndarray, side: str) -> np.ndarray:
+        """
+        Return a view of the mask_size x mask_size patch centered on one eye, shifted to stay inside the frame.
+        """
+        landmarks = self.get_eye_landmarks(frame)
+        center_x, center_y = landmarks[EYE_SIDES[side]].mean(0).astype(int)
+        height, width = frame.shape[:2]
+        y0 = min(max(center_y - self.mask_size // 2, 0), max(height - self.mask_size, 0))
+        x0 = min(max(center_x - self.mask_size // 2, 0), max(width - self.mask_size, 0))
+        return frame[y0:y0 + self.mask_size, x0:x0 + self.mask_size]
+
+
+class EyeRegion:
+    """
+    Eye polygon given by its bounding box slices into the frame and a boolean mask of the box size.
+    """
+    def __init__(self, rows: slice, cols: slice, mask: np.ndarray) -> None:
+        self.rows = rows
+        self.cols = cols
+        self.mask = mask
+
+    @property
+    def slices(self) -> Tuple[slice, slice]:
+        return self.rows, self.cols
+
+    @property
+    def area(self) -> int:
+        return int(np.count_nonzero(self.mask))
+
+    def pixels(self, frame: np.ndarray) -> np.ndarray:
+        """Pixels of the frame inside the eye polygon."""
+        return frame[self.slices][self.mask]
+
+
+class FaceMeshLandmarksDetector(BaseEyeLandmarksDetector, backend='facemesh'):
+    """
+    Eye landmarks from MediaPipe FaceMesh.
+    With tracking enabled, inference runs on a padded face ROI around the previous
+    landmarks, downscaled to at most roi_max_size pixels, and falls back to the
+    full frame whenever the face is lost or leaves the ROI.
+    """
     LEFT_EYE_LANDMARKS: List[int] = [33, 160, 158, 133, 153, 144]
     RIGHT_EYE_LANDMARKS: List[int] = [362, 385, 387, 263, 373, 380]
-
-    def __init__(self, mask_size: int, default_landmarks_path: str) -> None:
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=False, max_num_faces=1, refine_landmarks=True
+    EYE_LANDMARKS = np.array([LEFT_EYE_LANDMARKS, RIGHT_EYE_LANDMARKS])
+    provides_face_mesh = True
+    # Wire format of a serialized NormalizedLandmark holding only x, y and z:
+    # message tag, length, then a tag and a little-endian float per field
+    LANDMARK_RECORD = np.dtype([
+        ('tag', 'u1'), ('length', 'u1'),
+        ('x_tag', 'u1'), ('x', '<f4'), ('y_tag', 'u1'), ('y', '<f4'), ('z_tag', 'u1'), ('z', '<f4'),
+    ])
+    LANDMARK_RECORD_TAGS = {'tag': 0x0a, 'length': 15, 'x_tag': 0x0d, 'y_tag': 0x15, 'z_tag': 0x1d}
+
+    def __init__(
+            self,
+            mask_size: int,
+            default_landmarks_path: str,
+            cache_size: int = 2,
+            tracking: bool = False,
+            roi_padding: float = 0.3,
+            roi_max_size: int = 320
+            ) -> None:
+        super().__init__(mask_size, cache_size)
+        self.face_mesh = None  # Built by load_graphs on first use
+        self.roi_face_mesh = None
+        # Normalized (x, y) of all face landmarks, used until a face is found. Memory-mapped, never written to
+        self.default_landmarks = np.load(default_landmarks_path, mmap_mode='r').view(np.ndarray)
+        self.face_landmarks = self.default_landmarks
+        self.tracking = tracking
+        self.roi_padding = roi_padding  # ROI padding around the face, relative to the face size
+        self.roi_max_size = roi_max_size  # Longest ROI side passed to FaceMesh, larger crops are downscaled
+        self.roi: Optional[Tuple[int, int, int, int]] = None  # (x0, y0, x1, y1) of the tracked face ROI
+        self.face_landmarks_cache = LandmarksCache(cache_size)
+        self.image_buffers: Dict[str, np.ndarray] = {}  # Downscaled and RGB images passed to FaceMesh, reused across frames
+
+    @classmethod
+    def landmarks_to_array(cls, face_landmarks) -> np.ndarray:
+        """
+        Return the normalized (x, y) of all landmarks as a float32 array of shape (n_landmarks, 2).
+        The serialized message is decoded in one pass when it has the plain x, y, z layout,
+        instead of reading each coordinate through the protobuf objects.
+        """
+        n_landmarks = len(face_landmarks.landmark)
+        data = face_landmarks.SerializeToString()
+        if n_landmarks and len(data) == n_landmarks * cls.LANDMARK_RECORD.itemsize:
+            records = np.frombuffer(data, dtype=cls.LANDMARK_RECORD)
+            if all((records[field] == value).all() for field, value in cls.LANDMARK_RECORD_TAGS.items()):
+                array = np.empty((n_landmarks, 2), dtype=np.float32)
+                array[:, 0] = records['x']
+                array[:, 1] = records['y']
+                return array
+        return np.array([(point.x, point.y) for point in face_landmarks.landmark], dtype=np.float32)
+
+    def load_graphs(self) -> None:
+        """
+        Import MediaPipe and build the FaceMesh graphs, once. Deferred to the first use,
+        so that an instance fed with landmarks from an inference pool never builds them.
+        """
+        if self.face_mesh is not None:
+            return
+        with startup_profiler.phase('mediapipe import'):
+            import mediapipe as mp  # Takes most of the import time, only paid when this backend is used
+        with startup_profiler.phase('FaceMesh graph init'):
+            self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+                static_image_mode=False, max_num_faces=1, refine_landmarks=True
+            )
+            # FaceMesh tracks faces across calls, so crops get their own graph instead of alternating with full frames
+            self.roi_face_mesh = mp.solutions.face_mesh.FaceMesh(
+                static_image_mode=False, max_num_faces=1, refine_landmarks=True
+            ) if self.tracking else None
+
+    def warm_up(self, frame_size: Tuple[int, int] = (640, 480)) -> None:
+        """
+        Build the graphs and run them once on a blank frame, so that the first camera frame does not pay
+        for the TFLite delegate setup (~45 ms here). No face is found, so the tracking state stays empty.
+        """
+        self.load_graphs()
+        frame = np.zeros((frame_size[1], frame_size[0], 3), dtype=np.uint8)
+        for face_mesh in (self.face_mesh, self.roi_face_mesh):
+            if face_mesh is not None:
+                face_mesh.process(frame)
+
+    def get_face_landmarks(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Return the normalized (x, y) of all face landmarks of a frame, running inference at most once per frame.
+        Falls back to the previous landmarks if no face is found.
+        """
+        face_landmarks = self.face_landmarks_cache.get(frame)
+        if face_landmarks is None:
+            with self.latency.measure(frame):
+                face_landmarks = self.detect_face_landmarks(frame)
+            face_landmarks = self.update_face_landmarks(face_landmarks)
+            self.face_landmarks_cache.put(frame, face_landmarks)
+        return face_landmarks
+
+    def update_face_landmarks(self, face_landmarks: Optional[np.ndarray]) -> np.ndarray:
+        """Keep newly found landmarks, or count the miss and return the previous ones."""
+        self.record_face_found(face_landmarks is not None)
+        if face_landmarks is not None:  # use prev landmarks as default
+            self.face_landmarks = face_landmarks
+        elif self.face_landmarks is self.default_landmarks:
+            instrumentation.count('default_landmarks_used')
+        return self.face_landmarks
+
+    def get_frame_landmarks(self, frame: np.ndarray) -> np.ndarray:
+        return self.get_face_landmarks(frame)
+
+    def set_frame_landmarks(self, frame: np.ndarray, face_landmarks: np.ndarray, face_found: bool = True) -> None:
+        """Without a face, the previous landmarks of this instance are used, like after a miss of its own inference."""
+        face_landmarks = self.update_face_landmarks(face_landmarks if face_found else None)
+        self.face_landmarks_cache.put(frame, face_landmarks)
+
+    def get_landmarks(self, frame: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        """
+        Return the landmarks at the given FaceMesh indices in pixels, with shape indices.shape + (2,).
+        """
+        scale = np.array([frame.shape[1], frame.shape[0]], dtype=np.float32)
+        return self.get_face_landmarks(frame)[indices] * scale
+
+    def compute_eye_landmarks(self, frame: np.ndarray) -> np.ndarray:
+        return self.get_landmarks(frame, self.EYE_LANDMARKS)
+
+    def detect_face_landmarks(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Return the normalized landmarks of the face in frame coordinates, or None if no face was found.
+        """
+        self.load_graphs()
+        if self.roi is not None and (self.roi[2] > frame.shape[1] or self.roi[3] > frame.shape[0]):
+            self.roi = None  # Frame size changed, e.g. after a camera or capture format change
+        if self.tracking and self.roi is not None:
+            face_landmarks = self.process(frame, self.roi)
+            if face_landmarks is not None and self.is_inside_roi(face_landmarks, frame.shape):
+                self.update_roi(face_landmarks, frame.shape)
+                return face_landmarks
+            self.roi = None  # Tracking lost, fall back to full-frame detection
+
+        face_landmarks = self.process(frame)
+        if self.tracking and face_landmarks is not None:
+            self.update_roi(face_landmarks, frame.shape)
+        return face_landmarks
+
+    def process(self, frame: np.ndarray, roi: Optional[Tuple[int, int, int, int]] = None) -> Optional[np.ndarray]:
+        """
+        Run FaceMesh on the frame or on a crop of it and map the landmarks back to normalized frame coordinates.
+        The crop is downscaled and converted to RGB into reused buffers, and the RGB image is passed
+        read-only so that MediaPipe does not copy it again.
+        """
+        height, width = frame.shape[:2]
+        x0, y0, x1, y1 = roi if roi is not None else (0, 0, width, height)
+        image = frame[y0:y1, x0:x1]
+        scale = self.roi_max_size / max(x1 - x0, y1 - y0) if roi is not None else 1.0
+        key = 'roi' if roi is not None else 'frame'
+        if scale < 1.0:
+            size = (max(1, round((x1 - x0) * scale)), max(1, round((y1 - y0) * scale)))
+            resized = self.image_buffer(f'{key}_resized', (size[1], size[0], 3))
+            image = cv2.resize(image, size, dst=resized, interpolation=cv2.INTER_LINEAR)
+
+        face_mesh = self.roi_face_mesh if roi is not None else self.face_mesh
+        with instrumentation.stage('color_conversion'):
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self.image_buffer(f'{key}_rgb', image.shape))
+            image.flags.writeable = False
+        with instrumentation.stage('facemesh'):
+            results = face_mesh.process(image)
+        if not results.multi_face_landmarks:
+            return None
+        face_landmarks = self.landmarks_to_array(results.multi_face_landmarks[0])
+        if roi is not None:
+            face_landmarks *= np.array([(x1 - x0) / width, (y1 - y0) / height], dtype=np.float32)
+            face_landmarks += np.array([x0 / width, y0 / height], dtype=np.float32)
+        return face_landmarks
+
+    def image_buffer(self, key: str, shape: Tuple[int, ...]) -> np.ndarray:
+        """Writable uint8 buffer of the given shape, reallocated only when the shape changes."""
+        buffer = self.image_buffers.get(key)
+        if buffer is None or buffer.shape != shape:
+            buffer = self.image_buffers[key] = np.empty(shape, dtype=np.uint8)
+        buffer.flags.writeable = True
+        return buffer
+
+    def face_box(self, face_landmarks: np.ndarray, shape: Tuple[int, ...]) -> Tuple[float, float, float, float]:
+        x0, y0 = face_landmarks.min(0) * (shape[1], shape[0])
+        x1, y1 = face_landmarks.max(0) * (shape[1], shape[0])
+        return x0, y0, x1, y1
+
+    def is_inside_roi(self, face_landmarks: np.ndarray, shape: Tuple[int, ...]) -> bool:
+        """
+        Tracking confidence check: the face must not touch the ROI borders (i.e. be clipped),
+        unless the border is also the frame border, and must not be tiny compared to the ROI.
+        """
+        x0, y0, x1, y1 = self.face_box(face_landmarks, shape)
+        roi_x0, roi_y0, roi_x1, roi_y1 = self.roi
+        margin = 0.05 * max(x1 - x0, y1 - y0)
+        inside = (
+            (x0 - roi_x0 > margin or roi_x0 == 0) and (y0 - roi_y0 > margin or roi_y0 == 0)
+            and (roi_x1 - x1 > margin or roi_x1 == shape[1]) and (roi_y1 - y1 > margin or roi_y1 == shape[0])
+        )
+        large_enough = (x1 - x0) > 0.3 * (roi_x1 - roi_x0)
+        return inside and large_enough
+
+    def update_roi(self, face_landmarks: np.ndarray, shape: Tuple[int, ...]) -> None:
+        """
+        Set a square ROI around the face, padded by roi_padding and clipped to the frame.
+        The ROI is kept as long as the face stays well inside it, so FaceMesh sees a stable crop.
+        """
+        x0, y0, x1, y1 = self.face_box(face_landmarks, shape)
+        size = max(x1 - x0, y1 - y0)
+        if self.roi is not None:
+            roi_x0, roi_y0, roi_x1, roi_y1 = self.roi
+            margin = 0.5 * self.roi_padding * size
+            if (x0 - roi_x0 > margin or roi_x0 == 0) and (y0 - roi_y0 > margin or roi_y0 == 0) \
+                    and (roi_x1 - x1 > margin or roi_x1 == shape[1]) and (roi_y1 - y1 > margin or roi_y1 == shape[0]):
+                return
+        half_size = (0.5 + self.roi_padding) * size
+        center_x, center_y = (x0 + x1) / 2, (y0 + y1) / 2
+        self.roi = (
+            max(0, int(center_x - half_size)), max(0, int(center_y - half_size)),
+            min(shape[1], int(center_x + half_size)), min(shape[0], int(center_y + half_size)),
         )
-        self.mask_size = mask_size
-        with open(default_landmarks_path, "rb") as f:
-            self.face_landmarks = pickle.load(f)
-
-    def get_eye_landmarks(self, frame: np.ndarray) -> Dict[str, List[Tuple[int, int]]]:
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb_frame)
-        eye_landmarks = {'left_eye': [], 'right_eye': []}
-
-        if results.multi_face_landmarks:  # use prev landmarks as default
-            self.face_landmarks = results.multi_face_landmarks[0]
-
-        eye_landmarks['left_eye'] = [
-            (int(self.face_landmarks.landmark[i].x * frame.shape[1]),
-             int(self.face_landmarks.landmark[i].y * frame.shape[0]))
-            for i in self.LEFT_EYE_LANDMARKS
-        ]
-        eye_landmarks['right_eye'] = [
-            (int(self.face_landmarks.landmark[i].x * frame.shape[1]),
-             int(self.face_landmarks.landmark[i].y * frame.shape[0]))
-            for i in self.RIGHT_EYE_LANDMARKS
-        ]
-        return eye_landmarks
-
-    def create_eye_mask(self, frame: np.ndarray, side: str = 'left+right') -> np.ndarray:
-        landmarks = self.get_eye_landmarks(frame)
-        mask = np.zeros(frame.shape[:2], dtype=np.uint8)
-
-        if landmarks['left_eye'] and 'left' in side:
-            cv2.fillPoly(mask, [np.array(landmarks['left_eye'], dtype=np.int32)], 1)
-        if landmarks['right_eye'] and 'right' in side:
-            cv2.fillPoly(mask, [np.array(landmarks['right_eye'], dtype=np.int32)], 1)
-
-        return mask.astype(bool)
 
-    def create_eye_center_mask(self, frame: np.ndarray) -> np.ndarray:
-        landmarks = self.get_eye_landmarks(frame)
-        mask = np.zeros(frame.shape[:2], dtype=bool)
-        center_right = np.array(landmarks['right_eye'], dtype=np.int32).mean(0)
-        center_left = np.array(landmarks['left_eye'], dtype=np.int32).mean(0)
 
-        slice_right_y = slice(
-            int(center_right[0]) - self.mask_size // 2,
-            int(center_right[0]) + self.mask_size // 2
-        )
-        slice_right_x = slice(
-            int(center_right[1]) - self.mask_size // 2,
-            int(center_right[1]) + self.mask_size // 2
+class HaarCascadeLandmarksDetector(BaseEyeLandmarksDetector, backend='haar_cascade'):
+    """
+    Approximate eye landmarks from the Haar cascades bundled with OpenCV, without MediaPipe.
+    The face is searched around the previous face at a fixed scale, or on the whole downscaled frame
+    when it was lost; one eye is then detected in each half of the upper face.
+    Each eye box is turned into six points in the order of the FaceMesh eye contour; the lid opening
+    is not measured, so this backend suits the region based detectors (intensity, symmetry, surface,
+    pixel, uniformity) but not vertical distance or eye aspect ratio.
+    Keeps the previous landmarks when the face or an eye is not found.
+    """
+    DEFAULT_EYE_BOXES = np.array([[0.35, 0.37, 0.12, 0.07], [0.53, 0.37, 0.12, 0.07]])  # Normalized (x, y, w, h)
+    CONTOUR = np.array([(0.1, 0), (0.37, -1), (0.63, -1), (0.9, 0), (0.63, 1), (0.37, 1)])  # Relative to an eye box
+    LID_HEIGHT = 0.15  # Half of the eye opening, relative to the eye box height
+
+    def __init__(
+            self,
+            mask_size: int = 16,
+            cache_size: int = 2,
+            detection_width: int = 320,
+            face_size: int = 96,
+            face_cascade: str = 'haarcascade_frontalface_alt2.xml',
+            eye_cascade: str = 'haarcascade_eye.xml',
+            cascade_dir: Optional[str] = None
+            ) -> None:
+        super().__init__(mask_size, cache_size)
+        cascade_dir = cv2.data.haarcascades if cascade_dir is None else cascade_dir
+        self.face_cascade = self.load_cascade(os.path.join(cascade_dir, face_cascade))
+        self.eye_cascade = self.load_cascade(os.path.join(cascade_dir, eye_cascade))
+        self.detection_width = detection_width  # Frames are downscaled to this width to search the whole frame
+        self.face_size = face_size  # Face crops are rescaled to this width, large enough for the eye cascade
+        self.face_box: Optional[np.ndarray] = None  # (x, y, w, h) of the last detected face in pixels
+        self.eye_boxes = self.DEFAULT_EYE_BOXES  # Normalized (x, y, w, h) of the last detected eyes
+
+    @staticmethod
+    def load_cascade(path: str) -> cv2.CascadeClassifier:
+        cascade = cv2.CascadeClassifier(path)
+        if cascade.empty():
+            raise IOError(f"Could not load cascade classifier {path}.")
+        return cascade
+
+    def compute_eye_landmarks(self, frame: np.ndarray) -> np.ndarray:
+        eye_boxes = self.detect_eye_boxes(frame)
+        self.record_face_found(eye_boxes is not None)
+        if eye_boxes is not None:  # use prev landmarks as default
+            self.eye_boxes = eye_boxes
+
+        height, width = frame.shape[:2]
+        x, y, w, h = (self.eye_boxes * (width, height, width, height)).T[:, :, None]
+        landmarks = np.empty((2, len(self.CONTOUR), 2), dtype=np.float32)
+        landmarks[..., 0] = x + w * self.CONTOUR[:, 0]
+        landmarks[..., 1] = y + h * (0.5 + self.LID_HEIGHT * self.CONTOUR[:, 1])
+        return landmarks
+
+    def detect_eye_boxes(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """Return the normalized (x, y, w, h) of the left and right eye, or None if they were not both found."""
+        self.face_box = self.detect_face(frame)
+        if self.face_box is None:
+            return None
+        x, y, w, h = self.face_box.astype(int)
+        upper_face, scale = self.gray_crop(frame, (x, y, x + w, y + h * 3 // 5), self.face_size / w)
+        eye_size = upper_face.shape[1]
+        eyes = self.eye_cascade.detectMultiScale(
+            upper_face, scaleFactor=1.1, minNeighbors=3, minSize=(eye_size // 6,) * 2, maxSize=(eye_size // 2,) * 2
         )
-        slice_left_y = slice(
-            int(center_left[0]) - self.mask_size // 2,
-            int(center_left[0]) + self.mask_size // 2
+
+        eye_boxes = []
+        for half in (0, 1):  # Largest eye in the left and right half of the face
+            candidates = [eye for eye in eyes if (eye[0] + eye[2] / 2 >= eye_size / 2) == half]
+            if not candidates:
+                return None
+            eye_boxes.append(max(candidates, key=lambda eye: eye[2] * eye[3]))
+        eye_boxes = np.array(eye_boxes, dtype=np.float64) / scale + (x, y, 0, 0)
+        height, width = frame.shape[:2]
+        return eye_boxes / (width, height, width, height)
+
+    def detect_face(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """Return the (x, y, w, h) of the largest face in pixels, searching around the previous face first."""
+        height, width = frame.shape[:2]
+        if self.face_box is not None and self.face_box[0] + self.face_box[2] <= width \
+                and self.face_box[1] + self.face_box[3] <= height:  # Frame size may have changed
+            x, y, w, h = self.face_box
+            pad = w / 2
+            x0, y0 = int(max(x - pad, 0)), int(max(y - pad, 0))
+            x1, y1 = int(min(x + w + pad, width)), int(min(y + h + pad, height))
+            gray, scale = self.gray_crop(frame, (x0, y0, x1, y1), self.face_size / w)
+            faces = self.face_cascade.detectMultiScale(
+                gray, scaleFactor=1.2, minNeighbors=5,
+                minSize=(self.face_size * 3 // 4,) * 2, maxSize=(self.face_size * 4 // 3,) * 2
+            )
+            if len(faces):
+                return max(faces, key=lambda face: face[2] * face[3]) / scale + (x0, y0, 0, 0)
+
+        gray, scale = self.gray_crop(frame, (0, 0, width, height), self.detection_width / width)
+        faces = self.face_cascade.detectMultiScale(
+            gray, scaleFactor=1.1, minNeighbors=5, minSize=(gray.shape[1] // 8,) * 2
         )
-        slice_left_x = slice(
-            int(center_left[1]) - self.mask_size // 2,
-            int(center_left[1]) + self.mask_size // 2
+        if len(faces) == 0:
+            return None
+        return max(faces, key=lambda face: face[2] * face[3]) / scale
+
+    @staticmethod
+    def gray_crop(frame: np.ndarray, box: Tuple[int, int, int, int], scale: float) -> Tuple[np.ndarray, float]:
+        """Return the (x0, y0, x1, y1) crop of the frame in grayscale, downscaled by scale if below 1, and the scale used."""
+        x0, y0, x1, y1 = box
+        crop = frame[y0:y1, x0:x1]
+        if scale < 1:
+            crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+        else:
+            scale = 1.0
+        with instrumentation.stage('color_conversion'):
+            return cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY), scale
+
+
+class ReplayLandmarksDetector(BaseEyeLandmarksDetector, backend='replay'):
+    """
+    Landmarks recorded by SessionRecorder. Frames decoded from the recording (ReplayCapture or offline
+    processing) get the landmarks recorded with them, even if others are skipped; other frames get the
+    recorded landmarks in order, one set per new frame; past the end they start over with loop, like
+    ReplayCapture with loop, and otherwise keep the last recorded landmarks with no face found.
+    Replaying a recording with its own landmarks takes inference out of the loop, so blink detection
+    gives the same results on every run and on machines without MediaPipe.
+    """
+    def __init__(self, recording_path: str, mask_size: int = 16, cache_size: int = 2, loop: bool = False) -> None:
+        super().__init__(mask_size, cache_size)
+        self.recording = RecordingReader(recording_path)
+        self.loop = loop
+        self.provides_face_mesh = self.recording.landmarks_kind == 'face_mesh'
+        self.position = 0  # Next recorded frame for frames not decoded from the recording
+        self.frame_landmarks_cache = LandmarksCache(cache_size)
+
+    def get_frame_landmarks(self, frame: np.ndarray) -> np.ndarray:
+        """Recorded landmarks of a frame: normalized face mesh or eye landmarks in pixels."""
+        landmarks = self.frame_landmarks_cache.get(frame)
+        if landmarks is None:
+            number = replay_frame_numbers.get(frame)
+            if number is None:
+                if self.loop and self.position >= len(self.recording):
+                    self.position = 0
+                number = self.position
+            if number < len(self.recording):
+                landmarks = self.recording.landmarks(number)
+                self.record_face_found(self.recording.face_found(number))
+                self.position = number + 1
+            else:  # Past the end, keep the last landmarks like FaceMeshLandmarksDetector without a face
+                landmarks = self.recording.landmarks(len(self.recording) - 1)
+                self.record_face_found(False)
+            self.frame_landmarks_cache.put(frame, landmarks)
+        return landmarks
+
+    def set_frame_landmarks(self, frame: np.ndarray, landmarks: np.ndarray, face_found: bool = True) -> None:
+        self.record_face_found(face_found)
+        self.frame_landmarks_cache.put(frame, landmarks)
+
+    def get_landmarks(self, frame: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        """Same as FaceMeshLandmarksDetector.get_landmarks, for recordings of FaceMesh landmarks."""
+        if not self.provides_face_mesh:
+            raise ValueError("The recording has no face mesh landmarks.")
+        scale = np.array([frame.shape[1], frame.shape[0]], dtype=np.float32)
+        return self.get_frame_landmarks(frame)[indices] * scale
+
+    def compute_eye_landmarks(self, frame: np.ndarray) -> np.ndarray:
+        if self.provides_face_mesh:
+            return self.get_landmarks(frame, FaceMeshLandmarksDetector.EYE_LANDMARKS)
+        return self.get_frame_landmarks(frame)
+
+
+def create_eye_detector(backend: str, **kwargs) -> BaseEyeLandmarksDetector:
+    """Create a registered landmarks backend by name, e.g. 'facemesh' or 'haar_cascade'."""
+    if backend not in BaseEyeLandmarksDetector.backends:
+        raise ValueError(
+            f"Unknown landmarks backend {backend}, available: {', '.join(BaseEyeLandmarksDetector.backends)}."
         )
-
-        mask[slice_left_x, slice_left_y] = True
-        mask[slice_right_x, slice_right_y] = True
-        return mask
+    return BaseEyeLandmarksDetector.backends[backend](**kwargs)
 
 
 class BaseCalibrator:
@@ -100,6 +620,14 @@ class BaseCalibrator:
     def __call__(self, changes: np.ndarray) -> float:
         raise NotImplementedError
 
+    def get_state(self) -> Optional[Dict[str, Any]]:
+        """JSON-serializable summary of what the calibrator learned, None if it cannot be restored."""
+        return None
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """Resume from a state returned by get_state, e.g. saved in an earlier session."""
+        raise NotImplementedError
+
 
 class OneTimeCalibrator(BaseCalibrator):
 
@@ -168,145 +696,256 @@ class ContinuousCalibrator(BaseCalibrator):
         return -np.inf
 
 
-class BufferedModule:
+class RollingQuantileCalibrator(BaseCalibrator):
+    """
+    Continuous calibrator over the last `buffer_size` changes that keeps the
+    window sorted incrementally. Each frame costs one binary-search insertion
+    and one removal instead of a full sort of the window.
+    The threshold is the linearly interpolated quantile of the window, i.e. it
+    matches `np.quantile` on the same values up to float rounding (relative
+    difference below 1e-12). NaN changes are ignored.
+    """
 
-    def __init__(self, module: Callable[[List[np.ndarray]], np.ndarray], buffer_size: int) -> None:
-        self.module = module
+    def __init__(self, buffer_size: int, quantile: float) -> None:
+        self.quantile = quantile
         self.buffer_size = buffer_size
-        self.buffer: List[np.ndarray] = []
+        self.reset()
 
-    def __call__(self, x: np.ndarray) -> np.ndarray:
-        self.buffer.append(copy.deepcopy(x))
-        if self.buffer_size == len(self.buffer):
-            out = self.module(self.buffer)
-            self.buffer.pop(0)
-            return out
+    def reset(self) -> None:
+        self.buffer: Deque[List[float]] = deque()  # Values of each change, in arrival order
+        self.sorted_values: List[float] = []
+        self.threshold: Optional[float] = None
+
+    def set_threshold(self) -> None:
+        if not self.sorted_values:
+            self.threshold = -np.inf
+            return
+        position = self.quantile * (len(self.sorted_values) - 1)
+        lower = int(position)
+        upper = min(lower + 1, len(self.sorted_values) - 1)
+        lower_value = self.sorted_values[lower]
+        upper_value = self.sorted_values[upper]
+        self.threshold = lower_value + (upper_value - lower_value) * (position - lower)
+
+    def __call__(self, changes: np.ndarray) -> float:
+        values = [value for value in np.ravel(changes).tolist() if value == value]  # Drop NaNs
+        self.buffer.append(values)
+        for value in values:
+            insort(self.sorted_values, value)
+
+        if len(self.buffer) == self.buffer_size:
+            self.set_threshold()
+            for value in self.buffer.popleft():
+                del self.sorted_values[bisect_left(self.sorted_values, value)]
+            return self.threshold
+        return -np.inf
 
+    def get_state(self, max_values: int = 1024) -> Optional[Dict[str, Any]]:
+        """
+        Threshold and the distribution of the window as up to max_values evenly spaced quantiles,
+        None while the window is still filling up.
+        """
+        values = list(self.sorted_values)  # Copied at once, the processing thread may be updating it
+        if self.threshold is None or not values:
+            return None
+        if len(values) > max_values:
+            values = np.quantile(values, np.linspace(0, 1, max_values)).tolist()
+        return {'threshold': self.threshold, 'values': [round(value, 7) for value in values]}
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """
+        Seed the window with the saved distribution so the threshold is valid from the first frame.
+        The values are spread in shuffled order over all but one slot of the window, so new changes
+        replace an unbiased share of them and the threshold keeps adapting to the current conditions.
+        """
+        values = np.random.default_rng(0).permutation(np.asarray(state['values'], dtype=np.float64))
+        self.reset()
+        for chunk in np.array_split(values, max(1, self.buffer_size - 1)):
+            self.buffer.append(chunk.tolist())
+        self.sorted_values = sorted(values.tolist())
+        self.set_threshold()
 
-class FramewiseBlinkDetector(QObject):
-    blink_detected = pyqtSignal()
+
+class BufferedModule:
+    """
+    Streams frames through a framewise blink detector.
+    Every frame is reduced to its features once and only the changes between
+    consecutive frames are kept, in a fixed-size ring buffer covering the last
+    `buffer_size` frames. Raw frames are never stored.
+    """
+
+    def __init__(self, module: 'FramewiseBlinkDetector', buffer_size: int) -> None:
+        if buffer_size < 2:
+            raise ValueError("buffer_size must be at least 2 to compute framewise changes.")
+        self.module = module
+        self.buffer_size = buffer_size
+        self.reset()
+
+    def reset(self) -> None:
+        self.features: Optional[np.ndarray] = None  # Features of the latest frame
+        self.change: Optional[np.ndarray] = None  # Change between the two latest frames
+        self.changes: Optional[np.ndarray] = None  # Ring buffer of the last buffer_size - 1 changes
+        self.index = 0
+        self.count = 0
+
+    def __call__(self, x: np.ndarray) -> Optional[bool]:
+        with instrumentation.stage('features'):
+            previous_features, self.features = self.features, self.module.compute_frame_features(x)
+            if previous_features is None:
+                return None
+            self.change = np.asarray(self.module.compute_change(previous_features, self.features), dtype=np.float64)
+        if self.changes is None:
+            self.changes = np.zeros((self.buffer_size - 1,) + self.change.shape, dtype=np.float64)
+        self.changes[self.index] = self.change
+        self.index = (self.index + 1) % len(self.changes)
+        self.count += 1
+
+        if self.count >= len(self.changes):
+            return self.module(self.changes, self.change)
+        return None
+
+
+class FramewiseBlinkDetector:
 
     def __init__(self, eye_detector: BaseEyeLandmarksDetector, calibrator: BaseCalibrator) -> None:
-        super().__init__()
         self.eye_detector = eye_detector
         self.calibrator = calibrator
-
-    def __call__(self, frames: List[np.ndarray]) -> bool:
-        changes = self.compute_framewise_changes(frames)
-        self.threshold = self.calibrator(changes)
+        self.threshold: float = -np.inf
+        self.blink_listeners: List[Callable[[], None]] = []
+
+    def add_blink_listener(self, listener: Callable[[], None]) -> None:
+        """Register a callback invoked, from the processing thread, whenever a blink is detected."""
+        self.blink_listeners.append(listener)
+
+    def __call__(self, changes: np.ndarray, latest_change: np.ndarray) -> bool:
+        """
+        Update the calibrator with the latest change and check the whole window
+        of changes against the resulting threshold.
+        """
+        with instrumentation.stage('calibration'):
+            self.threshold = self.calibrator(latest_change)
         if self.is_above_threshold(changes):
-            self.blink_detected.emit()
+            instrumentation.count('blink_frames')
+            for listener in self.blink_listeners:
+                listener()
             return True
         return False
 
     def is_above_threshold(self, changes: np.ndarray) -> bool:
         return (changes > self.threshold).any()
 
-    def compute_framewise_changes(self, frames: List[np.ndarray]) -> np.ndarray:
+    def compute_frame_features(self, frame: np.ndarray) -> np.ndarray:
         raise NotImplementedError
 
+    def compute_change(self, previous_features: np.ndarray, features: np.ndarray) -> np.ndarray:
+        return np.abs(features - previous_features)
+
 
 class IntensityBlinkDetector(FramewiseBlinkDetector):
 
-    def compute_framewise_changes(self, frames: List[np.ndarray]) -> np.ndarray:
-        mean_intensity: List[float] = []
-        for frame in frames:
-            mask = self.eye_detector.create_eye_mask(frame)
-            mean_intensity.append(frame[mask].mean())
-        
-        mean_intensity = np.stack(mean_intensity)
-        return np.abs(np.diff(mean_intensity, axis=0))
+    def compute_frame_features(self, frame: np.ndarray) -> np.ndarray:
+        pixels_left = self.eye_detector.create_eye_region(frame, side='left').pixels(frame)
+        pixels_right = self.eye_detector.create_eye_region(frame, side='right').pixels(frame)
+        total = float(pixels_left.sum(dtype=np.float64) + pixels_right.sum(dtype=np.float64))
+        return np.float64(total / max(pixels_left.size + pixels_right.size, 1))
 
 
 class SymmetryBlinkDetector(FramewiseBlinkDetector):
 
-    def compute_framewise_changes(self, frames: List[np.ndarray]) -> np.ndarray:
-        mean_intensity_left: List[float] = []
-        mean_intensity_right: List[float] = []
-        for frame in frames:
-            mask = self.eye_detector.create_eye_mask(frame, side='left')
-            mean_intensity_left.append(frame[mask].mean())
-            mask = self.eye_detector.create_eye_mask(frame, side='right')
-            mean_intensity_right.append(frame[mask].mean())
+    def compute_frame_features(self, frame: np.ndarray) -> np.ndarray:
+        region_left = self.eye_detector.create_eye_region(frame, side='left')
+        region_right = self.eye_detector.create_eye_region(frame, side='right')
+        return np.array([region_left.pixels(frame).mean(), region_right.pixels(frame).mean()])
 
-        mean_intensity_left = np.stack(mean_intensity_left)
-        changes_left = np.abs(np.diff(mean_intensity_left, axis=0))
-
-        mean_intensity_right = np.stack(mean_intensity_right)
-        changes_right = np.abs(np.diff(mean_intensity_right, axis=0))
+    def compute_change(self, previous_features: np.ndarray, features: np.ndarray) -> np.ndarray:
+        changes_left, changes_right = np.abs(features - previous_features)
         return changes_left * changes_right
 
 
 class SurfaceBlinkDetector(FramewiseBlinkDetector):
 
-    def compute_framewise_changes(self, frames: List[np.ndarray]) -> np.ndarray:
-        mean_size_left: List[int] = []
-        mean_size_right: List[int] = []
-        for frame in frames:
-            mask = self.eye_detector.create_eye_mask(frame, side='left')
-            mean_size_left.append(mask.sum())
-            mask = self.eye_detector.create_eye_mask(frame, side='right')
-            mean_size_right.append(mask.sum())
-
-        mean_size_left = np.stack(mean_size_left)
-        changes_left = np.abs(np.diff(mean_size_left, axis=0))
+    def compute_frame_features(self, frame: np.ndarray) -> np.ndarray:
+        region_left = self.eye_detector.create_eye_region(frame, side='left')
+        region_right = self.eye_detector.create_eye_region(frame, side='right')
+        return np.array([region_left.area, region_right.area], dtype=np.float64)
 
-        mean_size_right = np.stack(mean_size_right)
-        changes_right = np.abs(np.diff(mean_size_right, axis=0))
-        return changes_left + changes_right
+    def compute_change(self, previous_features: np.ndarray, features: np.ndarray) -> np.ndarray:
+        return np.abs(features - previous_features).sum()
 
 
 class PixelBlinkDetector(FramewiseBlinkDetector):
+    """
+    Mean absolute difference of the eye center pixels between consecutive frames.
+    Pixels are compared as float32. Before the streaming buffer, uint8 pixels were subtracted directly, which
+    wrapped around for darkening pixels (e.g. 10 - 20 gave 246), so changes and calibrated thresholds are
+    lower than with earlier versions.
+    """
+
+    def compute_frame_features(self, frame: np.ndarray) -> np.ndarray:
+        patch_left = self.eye_detector.eye_center_patch(frame, side='left')
+        patch_right = self.eye_detector.eye_center_patch(frame, side='right')
+        return np.stack([patch_left, patch_right]).astype(np.float32)
 
-    def compute_framewise_changes(self, frames: List[np.ndarray]) -> np.ndarray:
-        pixels: List[np.ndarray] = []
-        for frame in frames:
-            mask = self.eye_detector.create_eye_center_mask(frame)
-            pixels.append(frame[mask])
-        
-        pixels = np.stack(pixels)
-        return np.abs(np.diff(pixels, axis=0)).mean()
+    def compute_change(self, previous_features: np.ndarray, features: np.ndarray) -> np.ndarray:
+        return np.abs(features - previous_features).mean()
 
 
 class VerticalDistanceBlinkDetector(FramewiseBlinkDetector):
 
-    def compute_framewise_changes(self, frames: List[np.ndarray]) -> np.ndarray:
-        vertical_distances: List[float] = []
-        for frame in frames:
-            landmarks = self.eye_detector.get_eye_landmarks(frame)
-            if landmarks['left_eye'] and landmarks['right_eye']:
-                left_eye_top = min(landmarks['left_eye'], key=lambda x: x[1])[1]
-                left_eye_bottom = max(landmarks['left_eye'], key=lambda x: x[1])[1]
-                right_eye_top = min(landmarks['right_eye'], key=lambda x: x[1])[1]
-                right_eye_bottom = max(landmarks['right_eye'], key=lambda x: x[1])[1]
+    def compute_frame_features(self, frame: np.ndarray) -> np.ndarray:
+        eye_y = self.eye_detector.get_eye_landmarks(frame)[..., 1]
+        eye_distances = eye_y.max(1) - eye_y.min(1)  # Per eye
+        return np.float64(eye_distances.mean())
+
+
+class EyeAspectRatioBlinkDetector(FramewiseBlinkDetector):
+    """
+    Eye aspect ratio of both eyes: mean lid opening over vertical point pairs, divided by a horizontal eye scale.
+    With FaceMesh the refined lid contour is used and the scale is the horizontal iris diameter, which stays
+    constant when squinting moves the eye corners. Other landmark sources use the six eye points and the eye width.
+    """
+    # FaceMesh landmark indices, [left, right] eye
+    UPPER_LID_LANDMARKS: List[List[int]] = [[161, 160, 159, 158, 157], [384, 385, 386, 387, 388]]
+    LOWER_LID_LANDMARKS: List[List[int]] = [[163, 144, 145, 153, 154], [381, 380, 374, 373, 390]]
+    IRIS_EDGE_LANDMARKS: List[List[int]] = [[469, 471], [474, 476]]
+    # Positions within the six eye landmarks
+    UPPER_LID_POINTS: List[int] = [1, 2]
+    LOWER_LID_POINTS: List[int] = [5, 4]
+    CORNER_POINTS: List[int] = [0, 3]
 
-                left_eye_distance = left_eye_bottom - left_eye_top
-                right_eye_distance = right_eye_bottom - right_eye_top
+    def __init__(self, eye_detector: BaseEyeLandmarksDetector, calibrator: BaseCalibrator) -> None:
+        super().__init__(eye_detector, calibrator)
+        self.refined = eye_detector.provides_face_mesh
+        self.landmark_indices = np.concatenate(
+            [self.UPPER_LID_LANDMARKS, self.LOWER_LID_LANDMARKS, self.IRIS_EDGE_LANDMARKS], axis=1
+        )
 
-                vertical_distances.append((left_eye_distance + right_eye_distance) / 2)
+    def compute_frame_features(self, frame: np.ndarray) -> np.ndarray:
+        if self.refined:
+            points = self.eye_detector.get_landmarks(frame, self.landmark_indices)
+            n_pairs = len(self.UPPER_LID_LANDMARKS[0])
+            upper, lower, edges = points[:, :n_pairs], points[:, n_pairs:2 * n_pairs], points[:, 2 * n_pairs:]
+        else:
+            points = self.eye_detector.get_eye_landmarks(frame)
+            upper, lower, edges = points[:, self.UPPER_LID_POINTS], points[:, self.LOWER_LID_POINTS], points[:, self.CORNER_POINTS]
+        opening = np.linalg.norm(upper - lower, axis=2).mean(1)
+        scale = np.linalg.norm(edges[:, 0] - edges[:, 1], axis=1)
+        return (opening / np.maximum(scale, 1e-6)).astype(np.float64)
 
-        vertical_distances = np.array(vertical_distances)
-        return np.abs(np.diff(vertical_distances, axis=0))
+    def compute_change(self, previous_features: np.ndarray, features: np.ndarray) -> np.ndarray:
+        return np.float64(np.abs(features - previous_features).mean())
 
 
 class UniformityBlinkDetector(FramewiseBlinkDetector):
 
-    def compute_framewise_changes(self, frames: List[np.ndarray]) -> np.ndarray:
-        mean_size_left: List[float] = []
-        mean_size_right: List[float] = []
-        for frame in frames:
-            mask = self.eye_detector.create_eye_mask(frame, side='left')
-            mean_size_left.append(frame[mask].var(0))
-            mask = self.eye_detector.create_eye_mask(frame, side='right')
-            mean_size_right.append(frame[mask].var(0))
-
-        mean_size_left = np.stack(mean_size_left)
-        changes_left = np.abs(np.diff(mean_size_left, axis=0))
+    def compute_frame_features(self, frame: np.ndarray) -> np.ndarray:
+        region_left = self.eye_detector.create_eye_region(frame, side='left')
+        region_right = self.eye_detector.create_eye_region(frame, side='right')
+        return np.stack([region_left.pixels(frame).var(0), region_right.pixels(frame).var(0)])
 
-        mean_size_right = np.stack(mean_size_right)
-        changes_right = np.abs(np.diff(mean_size_right, axis=0))
-        return changes_left + changes_right
+    def compute_change(self, previous_features: np.ndarray, features: np.ndarray) -> np.ndarray:
+        return np.abs(features - previous_features).sum(0)
 
 
 if __name__ == "__main__":
-    pass
\ No newline at end of file
+    pass
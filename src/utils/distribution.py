@@ -13,4 +13,29 @@ def set_working_directory():
     """Set working directory to the PyInstaller temporary directory if running as a packaged executable."""
     if hasattr(sys, '_MEIPASS'):
         # Change working directory to the PyInstaller temporary directory
-        os.chdir(sys._MEIPASS)
\ No newline at end of file
+        os.chdir(sys._MEIPASS)
+
+def user_cache_path(file_name):
+    """Return the path of a file in the per-user cache directory of the application, creating the directory."""
+    if sys.platform == 'win32':
+        base_dir = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+    elif sys.platform == 'darwin':
+        base_dir = os.path.expanduser('~/Library/Caches')
+    else:
+        base_dir = os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache'))
+    return app_dir_path(base_dir, file_name)
+
+def user_data_path(file_name):
+    """Return the path of a file in the per-user data directory of the application, creating the directory."""
+    if sys.platform == 'win32':
+        base_dir = os.environ.get('APPDATA', os.path.expanduser('~'))
+    elif sys.platform == 'darwin':
+        base_dir = os.path.expanduser('~/Library/Application Support')
+    else:
+        base_dir = os.environ.get('XDG_DATA_HOME', os.path.expanduser('~/.local/share'))
+    return app_dir_path(base_dir, file_name)
+
+def app_dir_path(base_dir, file_name):
+    app_dir = os.path.join(base_dir, 'neurablink')
+    os.makedirs(app_dir, exist_ok=True)
+    return os.path.join(app_dir, file_name)
\ No newline at end of file
@@ -0,0 +1,72 @@
+import time
+import numpy as np
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional
+from utils.detector import BufferedModule
+from utils.events import BlinkEventBus
+
+
+class FrameResult(NamedTuple):
+    """
+    Result of processing a single frame.
+    """
+    index: int  # Sequence number of the frame
+    timestamp: float  # Seconds, monotonic clock unless given by the frame source
+    is_blink: bool
+    threshold: float  # Calibrated threshold, -inf while the calibrator is warming up
+    features: Optional[np.ndarray]  # Features of this frame
+    change: Optional[np.ndarray]  # Change with respect to the previous frame
+    eye_landmarks: np.ndarray  # (2, n_points, 2), (x, y) of the left and right eye contours in pixels
+
+
+class BlinkEngine:
+    """
+    Headless blink detection pipeline: landmarks -> features -> calibrator -> blink events.
+    Does not depend on Qt; results are delivered by return value, iterator or callbacks.
+    Blink flags are also debounced into blink start and end events on blink_events.
+    """
+    def __init__(self, blink_detector: BufferedModule) -> None:
+        self.blink_detector = blink_detector
+        self.result_listeners: List[Callable[[FrameResult], None]] = []
+        self.blink_events = BlinkEventBus()
+        self.frame_index = 0
+
+    @property
+    def eye_detector(self):
+        return self.blink_detector.module.eye_detector
+
+    def add_result_listener(self, listener: Callable[[FrameResult], None]) -> None:
+        """Register a callback invoked with the result of every processed frame."""
+        self.result_listeners.append(listener)
+
+    def add_blink_listener(self, listener: Callable[[], None]) -> None:
+        """Register a callback invoked on every frame flagged as a blink, see blink_events for whole blinks."""
+        self.blink_detector.module.add_blink_listener(listener)
+
+    def reset(self) -> None:
+        """Forget the frame history, e.g. after the camera changed. A blink in progress is ended."""
+        self.blink_detector.reset()
+        self.blink_events.end_blink()
+        self.blink_events.reset()
+
+    def process(self, frame: np.ndarray, timestamp: Optional[float] = None) -> FrameResult:
+        """Run blink detection on the next frame of the stream."""
+        is_blink = bool(self.blink_detector(frame))
+        result = FrameResult(
+            index=self.frame_index,
+            timestamp=time.monotonic() if timestamp is None else timestamp,
+            is_blink=is_blink,
+            threshold=self.blink_detector.module.threshold,
+            features=self.blink_detector.features,
+            change=self.blink_detector.change,
+            eye_landmarks=self.eye_detector.get_eye_landmarks(frame),
+        )
+        self.frame_index += 1
+        self.blink_events.update(is_blink, result.timestamp)
+        for listener in self.result_listeners:
+            listener(result)
+        return result
+
+    def run(self, frames: Iterable[np.ndarray]) -> Iterator[FrameResult]:
+        """Process frames one by one and yield their results."""
+        for frame in frames:
+            yield self.process(frame)
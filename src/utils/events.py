@@ -0,0 +1,96 @@
+import threading
+from collections import deque
+from typing import Callable, Deque, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class BlinkEvent(NamedTuple):
+    """
+    Start or end of a blink. Consecutive frames flagged as blinking form one blink.
+    """
+    kind: str  # 'start' or 'end'
+    start: float  # Timestamp of the first flagged frame, seconds
+    end: float  # Timestamp of the last flagged frame so far, equal to start for 'start' events
+    n_frames: int  # Flagged frames so far
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class BlinkEventBus:
+    """
+    Debounces per-frame blink flags into blink start and end events and hands them to subscribers.
+    Frames flagged less than gap seconds apart belong to the same blink. A blink ends at the first update
+    more than gap seconds after its last flagged frame.
+    Direct subscribers are called in the thread feeding the bus. Queued subscribers are called by drain()
+    in the consuming thread, with every event accumulated since the previous drain; wakeup is called once
+    whenever events become pending, e.g. to schedule a single drain in the GUI thread.
+    Does not depend on Qt.
+    """
+    def __init__(self, gap: float = 0.15) -> None:
+        self.gap = gap
+        self.direct_subscribers: List[Tuple[Callable[[BlinkEvent], None], Sequence[str]]] = []
+        self.queued_subscribers: List[Tuple[Callable[[BlinkEvent], None], Sequence[str]]] = []
+        self.wakeup: Optional[Callable[[], None]] = None
+        self.pending: Deque[BlinkEvent] = deque()
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the current blink without ending it, e.g. after the camera changed."""
+        self.blink_start: Optional[float] = None  # Start of the current blink, None between blinks
+        self.last_flagged = 0.0
+        self.n_frames = 0
+
+    def subscribe(
+            self,
+            callback: Callable[[BlinkEvent], None],
+            kinds: Sequence[str] = ('start', 'end'),
+            queued: bool = False
+            ) -> None:
+        """Call callback with every event of the given kinds, from drain() if queued."""
+        (self.queued_subscribers if queued else self.direct_subscribers).append((callback, kinds))
+
+    def set_wakeup(self, wakeup: Callable[[], None]) -> None:
+        self.wakeup = wakeup
+
+    def end_blink(self) -> None:
+        """End the current blink at its last flagged frame, if any."""
+        if self.blink_start is not None:
+            self.publish(BlinkEvent('end', self.blink_start, self.last_flagged, self.n_frames))
+            self.blink_start = None
+
+    def update(self, is_blink: bool, timestamp: float) -> None:
+        """Register the blink flag of the next frame."""
+        if self.blink_start is not None and timestamp - self.last_flagged > self.gap:
+            self.end_blink()
+        if not is_blink:
+            return
+        if self.blink_start is None:
+            self.blink_start = timestamp
+            self.n_frames = 0
+            self.publish(BlinkEvent('start', timestamp, timestamp, 1))
+        self.last_flagged = timestamp
+        self.n_frames += 1
+
+    def publish(self, event: BlinkEvent) -> None:
+        for callback, kinds in self.direct_subscribers:
+            if event.kind in kinds:
+                callback(event)
+        if not self.queued_subscribers:
+            return
+        with self.lock:
+            was_empty = not self.pending
+            self.pending.append(event)
+        if was_empty and self.wakeup is not None:
+            self.wakeup()
+
+    def drain(self) -> int:
+        """Deliver the pending events to the queued subscribers. Returns the number of events delivered."""
+        with self.lock:
+            events, self.pending = list(self.pending), deque()
+        for event in events:
+            for callback, kinds in self.queued_subscribers:
+                if event.kind in kinds:
+                    callback(event)
+        return len(events)
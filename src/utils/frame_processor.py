@@ -1,31 +1,94 @@
 import cv2
+import math
 import numpy as np
-from PyQt6 import QtWidgets
+import threading
+import time
+from typing import Optional, Tuple
+from PyQt6 import QtWidgets, QtGui, QtCore
 from utils.screen import ControlWindow
-from utils.detector import BufferedModule
-from utils.camera import CameraManager
+from utils.detector import EYE_SIDES, BufferedModule
+from utils.engine import BlinkEngine
+from utils.events import BlinkEventBus
+from utils.camera import CameraManager, LatestFrameQueue
+from utils.scheduler import AdaptiveScheduler
+from utils.parallel import InferencePool
+from utils.instrumentation import instrumentation
+from utils.recording import SessionRecorder
 
-class FrameProcessor:
+class BlinkEventRelay(QtCore.QObject):
     """
-    Class to process frames from the camera and update the camera feed in the control window.
+    Delivers the events of a blink event bus to its queued subscribers in the GUI thread.
+    All events pending when the GUI gets to it are delivered by one queued call.
     """
+    def __init__(self, blink_events: 'BlinkEventBus') -> None:
+        super().__init__()
+        self.blink_events = blink_events
+        blink_events.set_wakeup(self.request_drain)
+
+    def request_drain(self):
+        QtCore.QMetaObject.invokeMethod(self, "drain", QtCore.Qt.ConnectionType.QueuedConnection)
+
+    @QtCore.pyqtSlot()
+    def drain(self):
+        self.blink_events.drain()
+
+
+class FrameProcessor(QtCore.QThread):
+    """
+    Thread running the BlinkEngine on frames from the camera, outside of the GUI thread.
+    Only the results (blink flag, eye landmarks and preview image) are sent back to the GUI.
+    Blink events are delivered to the GUI in batches through blink_event_relay.
+    The preview is rendered at the size of the camera feed, at most preview_fps times per second,
+    and not at all while the GUI has disabled it.
+    With a recorder, every frame is recorded with the landmarks it was processed with.
+    """
+    frame_processed = QtCore.pyqtSignal(bool, object, QtGui.QImage)
+
     def __init__(
-            self, 
-            blink_detector: 'BufferedModule', 
-            cap: cv2.VideoCapture, 
-            app: QtWidgets.QApplication, 
-            control_window: 'ControlWindow', 
+            self,
+            blink_detector: 'BufferedModule',
+            cap: cv2.VideoCapture,
+            app: QtWidgets.QApplication,
+            control_window: 'ControlWindow',
             camera_manager: 'CameraManager',
-            highlight_intensity: int = 100
+            frame_queue: 'LatestFrameQueue',
+            highlight_intensity: int = 100,
+            scheduler: Optional['AdaptiveScheduler'] = None,
+            inference_pool: Optional['InferencePool'] = None,
+            preview_fps: float = 15.0,
+            recorder: Optional['SessionRecorder'] = None
             ) -> None:
+        super().__init__()
         self.blink_detector = blink_detector
+        self.engine = BlinkEngine(blink_detector)
+        self.blink_event_relay = BlinkEventRelay(self.engine.blink_events)  # Created in the GUI thread
         self.cap = cap
         self.app = app
         self.control_window = control_window
         self.camera_manager = camera_manager
+        self.frame_queue = frame_queue
+        self.scheduler = scheduler  # Optional, runs detection on every frame if None
+        self.inference_pool = inference_pool  # Optional, extracts landmarks in a worker process instead of this thread
+        self.last_result = None
+        self.recorder = recorder
+        self.last_frame_landmarks = None  # Landmarks of the last processed frame, recorded for skipped frames
         self.highlight_intensity = highlight_intensity  # Adjust to reduce or increase highlight intensity
         self.blink_persist_frames = int(self.camera_manager.fps * 0.2)  # Number of frames to persist the red highlight
         self.blink_counter = 0  # Counter to track frames after a blink
+        self.running = False
+        self.paused = False
+        self.processing_lock = threading.Lock()  # Held while a frame is processed, pause() waits for it
+        self.preview_pending = threading.Event()  # Set while the GUI has not displayed the last preview
+        self.preview_fps = preview_fps  # Preview rate limit in Hz, independent of the detection rate
+        self.preview_size: Optional[Tuple[int, int]] = None  # (width, height) of the camera feed in pixels
+        self.preview_enabled = True
+        self.preview_buffer: Optional[np.ndarray] = None  # BGR preview image, reused once the GUI displayed it
+        self.last_preview_time = -math.inf
+
+    @property
+    def effective_rate(self) -> Optional[float]:
+        """Current blink detection rate in Hz, None while unknown or without scheduler."""
+        return self.scheduler.effective_rate if self.scheduler else None
 
     def update_blink_persist_frames(self):
         """
@@ -33,30 +96,131 @@ class FrameProcessor:
         """
         self.blink_persist_frames = int(self.camera_manager.fps * 0.2)  # Update based on current FPS
 
-    def process_frames(self):
-        """
-        Process frames from the camera and update the camera feed in the control window.
-        """
-        if self.cap.isOpened():
-            ret, frame = self.cap.read()
-            if not ret:
-                print("Error: Failed to read from the camera.")
-                self.camera_manager.stop()
-                return
-            
-            is_blink = self.blink_detector(frame) # Detect blink
-            eye_mask = self.blink_detector.module.eye_detector.create_eye_mask(frame)
-
-            # Highlight eyes area
-            if is_blink:
-                self.blink_counter = self.blink_persist_frames  # Reset counter if blink detected
-
-            # Highlight eyes area
-            if self.blink_counter > 0:
-                frame[eye_mask, 2] = self.highlight_intensity  # Increase red
-                self.blink_counter -= 1  # Decrease counter
-            else:
-                frame[eye_mask, 1] = self.highlight_intensity  # Increase green
-
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)  # Convert BGR to RGB for Qt display
-            self.control_window.update_camera_feed(rgb_frame)  # Update camera feed
\ No newline at end of file
+    def run(self):
+        """
+        Process the latest available frame until stopped.
+        """
+        self.running = True
+        while self.running:
+            frame = self.frame_queue.get(timeout=0.1)
+            if frame is None:
+                continue
+            with self.processing_lock:
+                if self.paused:
+                    continue
+                with instrumentation.stage('frame'):
+                    self.process_frame(frame)
+
+    def stop(self):
+        """Stop processing frames and wait for the thread to finish."""
+        self.running = False
+        self.wait()
+
+    def reset(self):
+        """
+        Start over after a camera change: forget the frame history, the scheduler's rate estimates and the
+        last result. Only call while paused, these belong to the processing thread.
+        """
+        self.engine.reset()
+        if self.scheduler is not None:
+            self.scheduler.reset()
+        self.last_result = None
+        self.last_frame_landmarks = None
+        self.blink_counter = 0
+
+    def pause(self):
+        """
+        Skip incoming frames, e.g. while the camera is being changed. Returns once the frame being processed
+        is done, so that the blink detector can then be used from another thread.
+        """
+        self.paused = True
+        with self.processing_lock:
+            pass
+
+    def resume(self):
+        """Resume processing incoming frames."""
+        self.paused = False
+
+    def preview_consumed(self):
+        """Called by the GUI once the last preview image has been displayed."""
+        self.preview_pending.clear()
+
+    def set_preview_size(self, width: int, height: int):
+        """Render the preview to fit in width x height pixels."""
+        self.preview_size = (width, height)
+
+    def set_preview_enabled(self, enabled: bool):
+        """Stop or resume rendering the preview, e.g. while the control window is minimized."""
+        self.preview_enabled = enabled
+
+    def process_frame(self, frame: np.ndarray):
+        """
+        Detect blinks in a frame and send the results with a preview image to the GUI.
+        Frames skipped by the scheduler reuse the landmarks of the last processed frame.
+        The preview is dropped if the GUI has not displayed the previous one yet or the preview rate is exceeded.
+        """
+        eye_detector = self.engine.eye_detector
+        should_process = self.scheduler.should_process() if self.scheduler is not None else True
+        if should_process or self.last_result is None:
+            start = time.perf_counter()
+            if self.inference_pool is not None:
+                landmarks, face_found = self.inference_pool.compute(frame)
+                eye_detector.set_frame_landmarks(frame, landmarks, face_found)
+            result = self.engine.process(frame)
+            if self.scheduler is not None:
+                self.scheduler.record(time.perf_counter() - start)
+                instrumentation.gauge('camera_rate_hz', self.scheduler.input_rate)
+                instrumentation.gauge('detection_rate_hz', self.effective_rate)
+            self.last_result = result
+            is_blink = result.is_blink
+            if self.recorder is not None:
+                self.last_frame_landmarks = eye_detector.get_frame_landmarks(frame)  # Cached, no inference
+        else:
+            eye_detector.set_eye_landmarks(frame, self.last_result.eye_landmarks)
+            is_blink = False
+            self.engine.blink_events.update(False, time.monotonic())  # Lets a blink end on time
+            instrumentation.count('frames_skipped')
+        if self.recorder is not None:
+            self.recorder.add(frame, time.monotonic(), self.last_frame_landmarks, eye_detector.face_found)
+
+        # Highlight eyes area
+        if is_blink:
+            self.blink_counter = self.blink_persist_frames  # Reset counter if blink detected
+        highlight_channel = 2 if self.blink_counter > 0 else 1  # Red after a blink, green otherwise (BGR)
+        if self.blink_counter > 0:
+            self.blink_counter -= 1  # Decrease counter
+
+        if not self.preview_enabled or self.preview_pending.is_set():
+            return  # Preview hidden or GUI stalled, drop this preview
+        now = time.monotonic()
+        if now - self.last_preview_time < 1 / self.preview_fps:
+            return
+        self.last_preview_time = now
+
+        with instrumentation.stage('preview'):
+            q_image = self.render_preview(frame, highlight_channel)
+        self.preview_pending.set()
+        self.frame_processed.emit(is_blink, self.last_result.eye_landmarks, q_image)
+
+    def render_preview(self, frame: np.ndarray, highlight_channel: int) -> QtGui.QImage:
+        """
+        Scale the frame into the reused preview buffer, fitting the preview size with the same aspect ratio,
+        and highlight the eyes on it. The buffer is wrapped as a BGR image without conversion or copy,
+        and the captured frame stays untouched.
+        """
+        height, width = frame.shape[:2]
+        target_width, target_height = self.preview_size or (width, height)
+        scale = min(target_width / width, target_height / height)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        if self.preview_buffer is None or self.preview_buffer.shape[:2] != (size[1], size[0]):
+            self.preview_buffer = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        preview = self.preview_buffer
+        cv2.resize(frame, size, dst=preview, interpolation=cv2.INTER_LINEAR)  # INTER_AREA costs ~25x more at 1080p
+
+        eye_detector = self.engine.eye_detector
+        landmarks = eye_detector.get_eye_landmarks(frame) * (size[0] / width, size[1] / height)
+        for side, index in EYE_SIDES.items():
+            region = eye_detector.create_polygon_region(landmarks[index], preview.shape, f'preview_{side}')
+            preview[region.slices][region.mask, highlight_channel] = self.highlight_intensity
+
+        return QtGui.QImage(preview.data, size[0], size[1], preview.strides[0], QtGui.QImage.Format.Format_BGR888)
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Deque, Dict, Iterator, Optional
+import numpy as np
+
+HISTOGRAM_EDGES_MS = [0, 1, 2, 5, 10, 20, 50, 100, 200, 500, float('inf')]  # Bucket edges of the stage histograms
+
+
+class Instrumentation:
+    """
+    Per-stage timers, event counters and gauges (latest value of a rate or level) of the live pipeline,
+    shared by all threads. Disabled by default, stage(), count() and gauge() then cost about as much as an attribute lookup.
+    Stages nest: frame contains features, which contains landmarks, which contains color_conversion.
+    Each stage keeps its last window durations for percentiles and a histogram.
+    """
+    def __init__(self) -> None:
+        self.enabled = False
+        self.window = 300
+        self.log_path: Optional[str] = None
+        self.start = time.monotonic()
+        self.stages: Dict[str, Deque[float]] = {}  # Stage -> durations in seconds over the window
+        self.stage_counts: Dict[str, int] = {}  # Stage -> all-time number of measurements
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.lock = threading.Lock()
+        self.disabled_stage = nullcontext()
+
+    def enable(self, window: int = 300, log_path: Optional[str] = None) -> None:
+        """Start recording, keeping window durations per stage. Snapshots are appended to log_path by write_log."""
+        self.window = window
+        self.log_path = log_path
+        self.start = time.monotonic()
+        self.enabled = True
+
+    def stage(self, name: str) -> ContextManager[None]:
+        """Context manager timing a stage of the pipeline."""
+        if not self.enabled:
+            return self.disabled_stage
+        return self.timed_stage(name)
+
+    @contextmanager
+    def timed_stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self.lock:
+            durations = self.stages.get(name)
+            if durations is None:
+                durations = self.stages[name] = deque(maxlen=self.window)
+            durations.append(seconds)
+            self.stage_counts[name] = self.stage_counts.get(name, 0) + 1
+
+    def count(self, name: str, n: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name: str, value: Optional[float]) -> None:
+        """Set the current value of a gauge, None values are ignored."""
+        if not self.enabled or value is None:
+            return
+        with self.lock:
+            self.gauges[name] = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Statistics of every stage over its window in milliseconds, the counters since enabling
+        and the latest value of every gauge.
+        """
+        with self.lock:
+            stages = {name: np.array(durations) * 1000 for name, durations in self.stages.items()}
+            stage_counts = dict(self.stage_counts)
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+        uptime = time.monotonic() - self.start
+        summary = {}
+        for name, durations in sorted(stages.items()):
+            summary[name] = {
+                'count': stage_counts[name],
+                'rate_hz': stage_counts[name] / uptime if uptime > 0 else None,
+                'mean_ms': float(durations.mean()),
+                'p50_ms': float(np.percentile(durations, 50)),
+                'p90_ms': float(np.percentile(durations, 90)),
+                'p99_ms': float(np.percentile(durations, 99)),
+                'max_ms': float(durations.max()),
+                'histogram': np.histogram(durations, bins=HISTOGRAM_EDGES_MS)[0].tolist(),
+            }
+        return {
+            'time': time.time(),
+            'uptime_s': uptime,
+            'histogram_edges_ms': HISTOGRAM_EDGES_MS[:-1],  # Lower edges, the last bucket is open-ended
+            'stages': summary,
+            'counters': counters,
+            'gauges': gauges,
+        }
+
+    def write_log(self) -> None:
+        """Append a snapshot as one JSON line to the log file, if any."""
+        if not self.enabled or self.log_path is None:
+            return
+        try:
+            with open(self.log_path, 'a') as file:
+                file.write(json.dumps(self.snapshot()) + '\n')
+        except OSError as e:
+            print(f"Warning: Could not write the stats log: {e}")
+
+    def format(self) -> str:
+        """Snapshot as a plain text table, for the stats panel."""
+        snapshot = self.snapshot()
+        lines = [f"{'stage':<18}{'Hz':>7}{'mean':>8}{'p90':>8}{'p99':>8}{'max':>8}  ms"]
+        for name, stats in snapshot['stages'].items():
+            lines.append(
+                f"{name:<18}{stats['rate_hz']:>7.1f}{stats['mean_ms']:>8.2f}"
+                f"{stats['p90_ms']:>8.2f}{stats['p99_ms']:>8.2f}{stats['max_ms']:>8.2f}"
+            )
+        if snapshot['gauges']:
+            lines.append("")
+            lines.extend(f"{name:<26}{value:>8.1f}" for name, value in sorted(snapshot['gauges'].items()))
+        if snapshot['counters']:
+            lines.append("")
+            lines.extend(f"{name:<26}{value:>8}" for name, value in sorted(snapshot['counters'].items()))
+        return "\n".join(lines)
+
+
+instrumentation = Instrumentation()
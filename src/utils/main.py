@@ -1,55 +1,198 @@
-import cv2
 import hydra
-from omegaconf import DictConfig
+from functools import partial
+from omegaconf import DictConfig, OmegaConf
 from PyQt6 import QtWidgets, QtGui, QtCore
 import sys
-from .screen import ControlWindow, BlurWindow, reset_all_windows
+import threading
+import time
+import traceback
+from .screen import ControlWindow, BlurWindow, DimmingController
+from .camera import CaptureSettings, FrameGrabber, LatestFrameQueue, format_capture, read_capture_format
+from .parallel import InferencePool
+from .startup import startup_profiler
+from .instrumentation import instrumentation
+from .profiles import CalibrationProfiles
+
+
+class DetectorLoader(QtCore.QThread):
+    """
+    Thread to build the blink detector and warm up its landmark backend while the window is already shown.
+    Emits the blink detector when it is ready, or None if it could not be built.
+    Without warm_up, e.g. when inference workers extract the landmarks, the backend is only built on first use.
+    """
+    detector_loaded = QtCore.pyqtSignal(object)
+
+    def __init__(self, blink_detector_config: DictConfig, warm_up: bool = True) -> None:
+        super().__init__()
+        self.blink_detector_config = blink_detector_config
+        self.warm_up = warm_up
+        self.blink_detector = None
+        self.done = threading.Event()
+
+    def run(self):
+        try:
+            with startup_profiler.phase('blink detector (total)'):
+                blink_detector = hydra.utils.instantiate(self.blink_detector_config)
+            if self.warm_up:
+                with startup_profiler.phase('landmarks warm-up'):
+                    blink_detector.module.eye_detector.warm_up()
+            self.blink_detector = blink_detector
+        except Exception:
+            traceback.print_exc()
+        self.done.set()
+        self.detector_loaded.emit(self.blink_detector)
+
+    def wait_for_detector(self):
+        """Block until the blink detector is built, for other loader threads. Returns None if building failed."""
+        self.done.wait()
+        return self.blink_detector
 
 
 class CameraLoader(QtCore.QThread):
     """
     Thread to load camera and emit signal when camera is loaded.
     """
-    camera_loaded = QtCore.pyqtSignal(cv2.VideoCapture)
+    camera_loaded = QtCore.pyqtSignal(object)  # cv2.VideoCapture or ReplayCapture
+
+    def __init__(self, capture_settings: CaptureSettings, detector_loader: DetectorLoader) -> None:
+        super().__init__()
+        self.capture_settings = capture_settings
+        self.detector_loader = detector_loader  # Its eye detector selects the resolution in auto mode
 
     def run(self):
-        cap = cv2.VideoCapture(0)
-        if cap.isOpened():
+        cap = self.capture_settings.create()
+        with startup_profiler.phase('camera open'):
+            opened = self.capture_settings.open(cap, 0)
+        if opened:
+            blink_detector = self.detector_loader.wait_for_detector() if self.capture_settings.auto_resolution else None
+            if blink_detector is not None:
+                with startup_profiler.phase('camera resolution selection'):
+                    self.capture_settings.select_resolution(cap, blink_detector.module.eye_detector)
+            print(f"Camera format: {format_capture(read_capture_format(cap))}")
             self.camera_loaded.emit(cap)
         else:
             print("Error: Could not access the camera.")
             sys.exit(1)
 
 
-def on_camera_loaded(cap, cfg, app, control_window):
+def record_blink(event):
+    """Count a finished blink and its duration in the instrumentation."""
+    instrumentation.count('blinks')
+    instrumentation.add('blink_duration', event.duration)
+
+
+def on_camera_loaded(cap, cfg, app, control_window, capture_settings):
     # Create the camera manager
-    camera_manager = hydra.utils.instantiate(cfg.camera_manager, cap=cap, app=app)
+    camera_manager = hydra.utils.instantiate(
+        cfg.camera_manager,
+        cap=cap,
+        app=app,
+        capture_settings=capture_settings,
+        eye_detector=control_window.blink_detector.module.eye_detector
+    )
     camera_manager.control_window = control_window  # Pass control window reference
     control_window.change_camera_func = camera_manager.change
     camera_manager.camera_changed.connect(camera_manager.on_camera_changed)
-    control_window.closeEvent = lambda event: camera_manager.stop()
 
-    # Instantiate the frame processor
+    # Capture frames in their own thread, only the latest frame is kept for processing.
+    # Replays hand every frame to processing instead, so that they give the same results on every run
+    replaying = bool(capture_settings.replay_path)
+    frame_queue = LatestFrameQueue(lossless=replaying)
+    frame_grabber = FrameGrabber(camera_manager, frame_queue)
+    frame_grabber.read_failed.connect(camera_manager.stop)
+
+    # Optionally extract landmarks in worker processes, each building its own eye detector from the config
+    inference_pool = None
+    if cfg.inference_workers > 0:
+        eye_detector_config = OmegaConf.to_container(cfg.blink_detector.module.eye_detector, resolve=True)
+        inference_pool = InferencePool(partial(hydra.utils.instantiate, eye_detector_config), cfg.inference_workers)
+
+    # Optionally record the session, to reproduce it later with capture.replay_path or src/offline.py
+    recorder = None
+    if cfg.get('recording') and cfg.recording.path:
+        recorder = hydra.utils.instantiate(cfg.recording)
+        eye_detector = control_window.blink_detector.module.eye_detector
+        landmarks_kind = 'face_mesh' if eye_detector.provides_face_mesh else 'eyes'
+        recorder.set_source(camera_manager.capture_format, landmarks_kind)
+        def on_recorded_camera_changed(success):
+            if success:
+                recorder.set_source(camera_manager.capture_format, landmarks_kind)
+        camera_manager.camera_changed.connect(on_recorded_camera_changed)  # After the camera manager read the new format
+        print(f"Recording the session to {recorder.path}")
+
+    # Instantiate the frame processor, replays process every frame instead of adapting to the CPU load
+    frame_processor_overrides = {'scheduler': None} if replaying else {}
     frame_processor = hydra.utils.instantiate(
         cfg.frame_processor,
+        **frame_processor_overrides,
         blink_detector=control_window.blink_detector,
         cap=cap,
         app=app,
         control_window=control_window,
-        camera_manager=camera_manager
+        camera_manager=camera_manager,
+        frame_queue=frame_queue,
+        inference_pool=inference_pool,
+        recorder=recorder
     )
-    control_window.frame_processor = frame_processor 
+    control_window.frame_processor = frame_processor
+
+    # Clear the screens during every blink, events reach the GUI thread in batches
+    blink_events = frame_processor.engine.blink_events
+    blink_events.subscribe(control_window.dimming_controller.on_blink_event, queued=True)
+    if instrumentation.enabled:
+        blink_events.subscribe(record_blink, kinds=('end',))
+
+    control_window.update_preview_size(*control_window.camera_feed.preview_size())
+    control_window.update_preview_enabled()
+    frame_processor.frame_processed.connect(control_window.on_frame_processed)
+
+    # Start from the calibration saved for this camera and resolution, and save it as it adapts.
+    # Replays always calibrate from scratch, so they are deterministic and leave the camera's profile alone.
+    use_profiles = cfg.get('calibration_profiles') and not replaying
+    profiles = hydra.utils.instantiate(cfg.calibration_profiles) if use_profiles else None
+    if profiles is not None:
+        blink_detector = control_window.blink_detector
+        def activate_profile(camera_index):
+            key = CalibrationProfiles.key(camera_index, camera_manager.capture_format, blink_detector)
+            frame_processor.pause()  # Restoring rebuilds the calibrator window, which the processor thread updates
+            profiles.activate(key, blink_detector.module.calibrator)
+            frame_processor.resume()
+        activate_profile(0)
+        def on_camera_changed(success):
+            if success:
+                activate_profile(camera_manager.camera_index)
+        camera_manager.camera_changed.connect(on_camera_changed)  # After the camera manager read the new format
+        profile_timer = QtCore.QTimer(control_window)
+        profile_timer.timeout.connect(profiles.save_current)
+        profile_timer.start(int(profiles.save_interval * 1000))
+
+    def stop_pipeline(event):
+        if profiles is not None:
+            profiles.save_current()
+        frame_processor.stop()
+        frame_grabber.stop()
+        camera_manager.stop()
+        if inference_pool is not None:
+            inference_pool.close()
+        if recorder is not None:
+            recorder.close()
+    control_window.closeEvent = stop_pipeline
 
-    # Initialize and start the timer for frame processing
-    control_window.frame_timer = QtCore.QTimer(control_window)
-    control_window.frame_timer.timeout.connect(control_window.frame_processor.process_frames)
-    control_window.frame_timer.start(16)  # Approximately 60 FPS
+    # Start capture and processing off the GUI thread
+    frame_processor.start()
+    frame_grabber.start()
     control_window.enable_ui_components() # Enable Start/Stop buttons + cam selector once camera is live
+    startup_profiler.report()
 
 
 def main_func(cfg: DictConfig):
-    # Instantiate the blink detector from configuration
-    blink_detector = hydra.utils.instantiate(cfg.blink_detector)
+    # Time the pipeline stages and count dropped frames and lost faces, shown in the control window
+    if cfg.verbose:
+        instrumentation.enable(window=cfg.instrumentation.window, log_path=cfg.instrumentation.log_path)
+
+    # Build the blink detector from configuration in the background, the window does not need it to show up
+    detector_loader = DetectorLoader(cfg.blink_detector, warm_up=cfg.inference_workers == 0)
+    detector_loader.start()
 
     # Initialize the Qt application and setup UI components
     try:
@@ -57,46 +200,76 @@ def main_func(cfg: DictConfig):
     except Exception as e:
         print(e)
         icon_path = cfg.icon_path
-    app = QtWidgets.QApplication([])
+    with startup_profiler.phase('QApplication'):
+        app = QtWidgets.QApplication([])
     if not QtGui.QIcon(icon_path).isNull():
         app.setWindowIcon(QtGui.QIcon(icon_path))
     else:
         print(f"Warning: Icon file not found at {icon_path}")
 
-    # Create blur windows for all screens
+    # Create blur windows for all screens, dimmed together by one controller
+    use_window_opacity = app.platformName() in ('xcb', 'windows', 'cocoa')  # Not supported on Wayland
     blur_windows = [
-        BlurWindow(screen) for screen in app.screens()
+        BlurWindow(screen, use_window_opacity) for screen in app.screens()
     ]
     for blur_window in blur_windows:
         blur_window.setGeometry(blur_window.screen().geometry())
         blur_window.hide()  # Initially hidden
-
-    # Connect the blink detector signal to reset blur windows
-    try:
-        blink_detector.module.blink_detected.connect(lambda: reset_all_windows(blur_windows))
-    except AttributeError as e:
-        print(f"Blink detector signal connection failed: {e}")
+    dimming_controller = DimmingController(blur_windows)
 
     # Create the control window
     control_window = ControlWindow(
-        blur_windows=blur_windows,
+        dimming_controller=dimming_controller,
         icon_path=icon_path,
         change_camera_func=None,
-        blink_detector=blink_detector,
+        blink_detector=None, #blink detector is set once loaded
         frame_processor=None #frame processor will be instantiated later
         )
     control_window.show()
     app.processEvents()  # Force the GUI to update
+    startup_profiler.add('control window shown (since launch)', time.perf_counter() - startup_profiler.start)
 
     # Initialize OpenCV VideoCapture
     print("Getting your camera stream. This may take a second...")
-    camera_loader = CameraLoader()
-    camera_loader.camera_loaded.connect(lambda cap: on_camera_loaded(cap, cfg, app, control_window))
+    capture_settings = hydra.utils.instantiate(cfg.capture)
+    camera_loader = CameraLoader(capture_settings, detector_loader)
+
+    # The pipeline starts once both the camera and the blink detector are loaded, in whichever order
+    loaded = {}
+    def on_loaded(key, value):
+        loaded[key] = value
+        if len(loaded) == 2:
+            on_camera_loaded(loaded['cap'], cfg, app, control_window, capture_settings)
+
+    detector_handled = threading.Event()
+    def on_detector_loaded(blink_detector):
+        if detector_handled.is_set():
+            return  # Already handled directly below
+        detector_handled.set()
+        if blink_detector is None:
+            print("Error: Could not load the blink detector.")
+            app.exit(1)
+            return
+        control_window.set_blink_detector(blink_detector)
+        on_loaded('blink_detector', blink_detector)
+
+    detector_loader.detector_loaded.connect(on_detector_loaded)
+    if detector_loader.done.is_set():
+        # The detector was ready before the connection, its signal had no receiver and is lost
+        on_detector_loaded(detector_loader.blink_detector)
+    camera_loader.camera_loaded.connect(lambda cap: on_loaded('cap', cap))
     camera_loader.start()
 
+    # Periodically append the stats to the log file
+    if instrumentation.enabled and instrumentation.log_path is not None:
+        log_timer = QtCore.QTimer()
+        log_timer.timeout.connect(instrumentation.write_log)
+        log_timer.start(int(cfg.instrumentation.log_interval * 1000))
+
     # Run application
     control_window.show()
     app.exec()
+    instrumentation.write_log()
 
     # Release camera on exit
     # if cap.isOpened():
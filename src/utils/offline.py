@@ -0,0 +1,202 @@
+import csv
+import os
+import time
+import cv2
+import numpy as np
+from typing import Iterator, List, Optional, Tuple
+from utils.engine import BlinkEngine, FrameResult
+from utils.parallel import InferencePool
+from utils.recording import RecordingReader, is_recording
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+
+class VideoFileSource:
+    """
+    Frame source reading a recorded video file as fast as it can be decoded.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open video file {path}.")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or None
+
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, float]]:
+        """Yield (frame, timestamp in seconds) pairs."""
+        index = 0
+        try:
+            while True:
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                timestamp = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                if timestamp <= 0 and index > 0 and self.fps:
+                    timestamp = index / self.fps  # Container without timestamps
+                yield frame, timestamp
+                index += 1
+        finally:
+            self.cap.release()
+
+
+class ImageDirectorySource:
+    """
+    Frame source reading the images of a directory in lexicographic order.
+    """
+    def __init__(self, path: str, fps: float) -> None:
+        self.path = path
+        self.fps = fps
+        self.files = sorted(
+            name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not self.files:
+            raise IOError(f"No images found in {path}.")
+
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, float]]:
+        """Yield (frame, timestamp in seconds) pairs, timestamps are derived from fps."""
+        for index, name in enumerate(self.files):
+            frame = cv2.imread(os.path.join(self.path, name))
+            if frame is None:
+                print(f"Warning: Could not read image {name}, skipping it.")
+                continue
+            yield frame, index / self.fps
+
+
+def open_frame_source(path: str, fps: float = 30.0):
+    """Return a frame source for a video file, a session recording or a directory of images."""
+    if is_recording(path):
+        return RecordingReader(path)
+    if os.path.isdir(path):
+        return ImageDirectorySource(path, fps=fps)
+    return VideoFileSource(path)
+
+
+class ResultWriter:
+    """
+    Writes per-frame results to CSV or Parquet, chosen by the file extension.
+    Vector features and changes are flattened into one column per value;
+    features with more than max_feature_columns values (e.g. raw pixels) are omitted.
+    Parquet output requires pyarrow.
+    """
+    def __init__(self, path: str, max_feature_columns: int = 16, row_group_size: int = 10000) -> None:
+        self.path = path
+        self.max_feature_columns = max_feature_columns
+        self.row_group_size = row_group_size
+        self.is_parquet = path.lower().endswith('.parquet')
+        self.columns: Optional[List[str]] = None
+        self.pending: List[FrameResult] = []  # Results waiting for the column layout to be known
+        self.rows: List[list] = []
+        self.file = None
+        self.csv_writer = None
+        self.parquet_writer = None
+        if self.is_parquet:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError as e:
+                raise ImportError("Writing Parquet files requires pyarrow: pip install pyarrow") from e
+
+    def write(self, result: FrameResult) -> None:
+        if self.columns is None:
+            self.pending.append(result)
+            if result.change is None:
+                return  # Change layout is only known from the second frame on
+            self.columns = self.make_columns(result)
+            for pending_result in self.pending:
+                self.write_row(self.make_row(pending_result))
+            self.pending = []
+            return
+        self.write_row(self.make_row(result))
+
+    def make_columns(self, result: FrameResult) -> List[str]:
+        self.n_features = np.size(result.features) if result.features is not None else 0
+        self.n_changes = np.size(result.change) if result.change is not None else 0
+        if self.n_features > self.max_feature_columns:
+            self.n_features = 0
+        return (
+            ['frame', 'timestamp', 'is_blink', 'threshold']
+            + [f'feature_{i}' for i in range(self.n_features)]
+            + [f'change_{i}' for i in range(self.n_changes)]
+        )
+
+    def make_row(self, result: FrameResult) -> list:
+        features = np.ravel(result.features)[:self.n_features].tolist() if self.n_features else []
+        if result.change is None:
+            changes = [float('nan')] * self.n_changes
+        else:
+            changes = np.ravel(result.change).tolist()
+        return [result.index, result.timestamp, int(result.is_blink), float(result.threshold)] + features + changes
+
+    def write_row(self, row: list) -> None:
+        if not self.is_parquet:
+            if self.csv_writer is None:
+                self.file = open(self.path, 'w', newline='')
+                self.csv_writer = csv.writer(self.file)
+                self.csv_writer.writerow(self.columns)
+            self.csv_writer.writerow(row)
+            return
+        self.rows.append(row)
+        if len(self.rows) >= self.row_group_size:
+            self.flush_parquet()
+
+    def flush_parquet(self) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if not self.rows:
+            return
+        table = pa.Table.from_pylist([dict(zip(self.columns, row)) for row in self.rows])
+        if self.parquet_writer is None:
+            self.parquet_writer = pq.ParquetWriter(self.path, table.schema)
+        self.parquet_writer.write_table(table)
+        self.rows = []
+
+    def close(self) -> None:
+        if self.columns is None and self.pending:
+            # Single-frame input: no change was ever computed
+            self.columns = self.make_columns(self.pending[0])
+            for pending_result in self.pending:
+                self.write_row(self.make_row(pending_result))
+        if self.is_parquet:
+            self.flush_parquet()
+            if self.parquet_writer is not None:
+                self.parquet_writer.close()
+        elif self.file is not None:
+            self.file.close()
+
+
+def process_offline(
+        engine: BlinkEngine,
+        source,
+        writer: ResultWriter,
+        log_every: int = 1000,
+        inference_pool: Optional[InferencePool] = None
+        ) -> int:
+    """
+    Run the blink detection engine over a frame source as fast as possible.
+    With an inference pool, landmarks are extracted in its worker processes while
+    features and calibration run here, in frame order.
+    Returns the number of processed frames.
+    """
+    start = time.perf_counter()
+    n_frames = 0
+    n_blinks = 0
+    if inference_pool is not None:
+        frames = inference_pool.imap(source)
+    else:
+        frames = ((frame, timestamp, None) for frame, timestamp in source)
+    try:
+        for frame, timestamp, inference in frames:
+            if inference is not None:
+                engine.eye_detector.set_frame_landmarks(frame, inference.landmarks, inference.face_found)
+            result = engine.process(frame, timestamp)
+            writer.write(result)
+            n_frames += 1
+            n_blinks += result.is_blink
+            if log_every and n_frames % log_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"Processed {n_frames} frames ({n_frames / elapsed:.1f} frames/s)")
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    print(f"Done: {n_frames} frames in {elapsed:.1f}s ({n_frames / max(elapsed, 1e-9):.1f} frames/s), "
+          f"{n_blinks} frames above threshold.")
+    return n_frames
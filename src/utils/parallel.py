@@ -0,0 +1,170 @@
+import multiprocessing as mp
+import queue
+import traceback
+import numpy as np
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from utils.detector import BaseEyeLandmarksDetector
+
+
+class InferenceResult(NamedTuple):
+    """Landmarks of a frame from a worker, with whether the worker's eye detector found the face in it."""
+    landmarks: Any  # Result of get_frame_landmarks
+    face_found: bool
+
+
+def inference_worker(make_eye_detector: Callable[[], BaseEyeLandmarksDetector], tasks, results) -> None:
+    """
+    Worker process loop: read frames from shared memory and send back their landmarks and face_found.
+    Tasks are (sequence number, slot, shared memory name, shape, dtype) tuples, None stops the worker.
+    """
+    try:
+        eye_detector = make_eye_detector()
+        eye_detector.warm_up()
+    except Exception:
+        results.put((None, None, traceback.format_exc(), False))
+        return
+    attached: Dict[int, shared_memory.SharedMemory] = {}  # Slot -> shared memory of that slot
+    retired: List[shared_memory.SharedMemory] = []  # Replaced slots, frames cached by the detector may still use them
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            sequence, slot, name, shape, dtype = task
+            memory = attached.get(slot)
+            if memory is None or memory.name != name:  # Slot was reallocated for larger frames
+                if memory is not None:
+                    retired.append(memory)
+                memory = attached[slot] = shared_memory.SharedMemory(name=name)
+            frame = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+            try:
+                landmarks = eye_detector.get_frame_landmarks(frame)
+                results.put((sequence, slot, landmarks, eye_detector.face_found))
+            except Exception:
+                results.put((sequence, slot, traceback.format_exc(), False))
+            del frame
+    finally:
+        eye_detector = frame = None  # Release the frame views before unmapping
+        for memory in list(attached.values()) + retired:
+            try:
+                memory.close()
+            except BufferError:
+                pass
+
+
+class InferencePool:
+    """
+    Runs landmark extraction in worker processes, each with its own eye detector from make_eye_detector.
+    Frames are copied into shared memory slots instead of being pickled, and results are returned
+    in submission order as InferenceResult. make_eye_detector must be picklable, e.g. a functools.partial.
+    Landmark backends that track the face across frames see only part of the frames in each worker,
+    so they fall back to a full search more often.
+    """
+    def __init__(
+            self,
+            make_eye_detector: Callable[[], BaseEyeLandmarksDetector],
+            n_workers: int,
+            max_in_flight: Optional[int] = None
+            ) -> None:
+        if n_workers < 1:
+            raise ValueError("n_workers must be at least 1.")
+        self.n_workers = n_workers
+        self.max_in_flight = max_in_flight or 2 * n_workers  # Frames submitted but not yet collected
+        context = mp.get_context('spawn')  # Forking a process with Qt and MediaPipe threads is unsafe
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        self.workers = [
+            context.Process(target=inference_worker, args=(make_eye_detector, self.tasks, self.results), daemon=True)
+            for _ in range(n_workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+        self.slots: List[Optional[shared_memory.SharedMemory]] = [None] * self.max_in_flight
+        self.free_slots: Deque[int] = deque(range(self.max_in_flight))
+        self.next_sequence = 0  # Sequence number of the next submitted frame
+        self.next_result = 0  # Sequence number of the next result to return
+        self.pending: Dict[int, InferenceResult] = {}  # Results received ahead of their turn, by sequence number
+
+    def __enter__(self) -> 'InferencePool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def in_flight(self) -> int:
+        return self.next_sequence - self.next_result
+
+    def submit(self, frame: np.ndarray) -> int:
+        """Copy a frame into a free slot and queue it for inference. Returns its sequence number."""
+        if not self.free_slots:
+            raise RuntimeError("All slots are in use, collect results before submitting more frames.")
+        slot = self.free_slots.popleft()
+        memory = self.slots[slot]
+        if memory is None or memory.size < frame.nbytes:
+            if memory is not None:
+                memory.close()
+                memory.unlink()
+            memory = self.slots[slot] = shared_memory.SharedMemory(create=True, size=max(frame.nbytes, 1))
+        np.ndarray(frame.shape, dtype=frame.dtype, buffer=memory.buf)[...] = frame
+        sequence = self.next_sequence
+        self.tasks.put((sequence, slot, memory.name, frame.shape, frame.dtype.str))
+        self.next_sequence += 1
+        return sequence
+
+    def collect(self, timeout: float = 30.0) -> InferenceResult:
+        """Return the result of the oldest submitted frame, waiting for it if needed."""
+        if self.in_flight == 0:
+            raise RuntimeError("No frame was submitted.")
+        while self.next_result not in self.pending:
+            try:
+                sequence, slot, landmarks, face_found = self.results.get(timeout=timeout)
+            except queue.Empty:
+                if not all(worker.is_alive() for worker in self.workers):
+                    raise RuntimeError("An inference worker died.")
+                continue
+            if isinstance(landmarks, str):  # Traceback of a failed worker
+                raise RuntimeError(f"Landmark inference failed in a worker process:\n{landmarks}")
+            self.free_slots.append(slot)
+            self.pending[sequence] = InferenceResult(landmarks, face_found)
+        self.next_result += 1
+        return self.pending.pop(self.next_result - 1)
+
+    def compute(self, frame: np.ndarray) -> InferenceResult:
+        """Run inference on a single frame in a worker and wait for its result."""
+        self.submit(frame)
+        return self.collect()
+
+    def imap(self, items: Iterable[Tuple[np.ndarray, Any]]) -> Iterator[Tuple[np.ndarray, Any, InferenceResult]]:
+        """
+        Yield (frame, payload, result) for (frame, payload) items in input order,
+        keeping up to max_in_flight frames in the workers.
+        """
+        waiting: Deque[Tuple[np.ndarray, Any]] = deque()
+        for frame, payload in items:
+            if self.in_flight >= self.max_in_flight:
+                result = self.collect()
+                yield waiting[0][0], waiting[0][1], result
+                waiting.popleft()
+            self.submit(frame)
+            waiting.append((frame, payload))
+        while waiting:
+            result = self.collect()
+            yield waiting[0][0], waiting[0][1], result
+            waiting.popleft()
+
+    def close(self) -> None:
+        """Stop the workers and release the shared memory."""
+        for _ in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        for memory in self.slots:
+            if memory is not None:
+                memory.close()
+                memory.unlink()
+        self.slots = [None] * self.max_in_flight
@@ -0,0 +1,84 @@
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+from .camera import list_v4l2_cameras
+from .distribution import user_data_path
+
+
+class CalibrationProfiles:
+    """
+    Calibrator states saved per camera, resolution and blink detector type in a small JSON file,
+    so detection starts calibrated instead of waiting for the calibrator window to fill up.
+    The file is written atomically (temporary file, then rename) and only by save(), which the
+    application calls every few minutes from the GUI thread, on camera changes and on exit.
+    """
+    VERSION = 1
+
+    def __init__(self, path: Optional[str] = None, save_interval: float = 120.0) -> None:
+        self.path = path or user_data_path('calibration_profiles.json')
+        self.save_interval = save_interval  # Seconds between saves while running
+        self.profiles: Dict[str, Dict[str, Any]] = self.read()
+        self.calibrator = None  # Calibrator of the live pipeline
+        self.current_key: Optional[str] = None  # Profile of the camera in use
+
+    def activate(self, key: str, calibrator) -> bool:
+        """Use the profile of key for the calibrator, saving the one in use before. Returns whether it was restored."""
+        self.save_current()
+        self.calibrator = calibrator
+        self.current_key = key
+        return self.load(key, calibrator)
+
+    def save_current(self) -> None:
+        if self.current_key is not None:
+            self.save(self.current_key, self.calibrator)
+
+    def read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path) as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Warning: Ignoring unreadable calibration profiles {self.path}: {e}")
+            return {}
+        if not isinstance(data, dict) or data.get('version') != self.VERSION:
+            return {}
+        return data.get('profiles', {})
+
+    @staticmethod
+    def key(camera_index: int, capture_format: Dict[str, Any], blink_detector) -> str:
+        """Profile key of a camera at its negotiated resolution, for the features of the given blink detector."""
+        camera = f"camera {camera_index}"
+        for index, name in list_v4l2_cameras() or []:
+            if index == camera_index:
+                camera = f"{camera} ({name})"
+        detector = type(blink_detector.module).__name__
+        return f"{camera} {capture_format['width']}x{capture_format['height']} {detector}"
+
+    def load(self, key: str, calibrator) -> bool:
+        """Restore the calibrator from its profile. Returns False if there is none for this key and calibrator."""
+        profile = self.profiles.get(key)
+        if profile is None or profile.get('calibrator') != type(calibrator).__name__:
+            return False
+        try:
+            calibrator.set_state(profile['state'])
+        except (KeyError, TypeError, ValueError, NotImplementedError) as e:
+            print(f"Warning: Could not restore calibration profile '{key}': {e}")
+            return False
+        print(f"Calibration profile loaded: {key}")
+        return True
+
+    def save(self, key: str, calibrator) -> None:
+        """Store the current state of the calibrator under key and write the file."""
+        state = calibrator.get_state()
+        if state is None:
+            return  # Still warming up, or the calibrator cannot be restored
+        self.profiles[key] = {'calibrator': type(calibrator).__name__, 'updated': time.time(), 'state': state}
+        temporary_path = f"{self.path}.tmp"
+        try:
+            with open(temporary_path, 'w') as file:
+                json.dump({'version': self.VERSION, 'profiles': self.profiles}, file)
+            os.replace(temporary_path, self.path)
+        except OSError as e:
+            print(f"Warning: Could not save calibration profiles to {self.path}: {e}")
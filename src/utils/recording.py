@@ -0,0 +1,334 @@
+import copy
+import json
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import OrderedDict
+import cv2
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .instrumentation import instrumentation
+
+RECORDING_VERSION = 2  # 2 stores the capture format per chunk
+SOURCE_KEYS = ('width', 'height', 'fps', 'fourcc', 'landmarks_kind')
+FRAME_FORMATS = {'jpg': '.jpg', 'png': '.png'}  # jpg is lossy but cheap enough to keep up with the camera
+
+
+class SessionRecorder:
+    """
+    Records what the frame processor sees to a directory, for replay with ReplayCapture or offline processing.
+    Frames are kept in chunks of chunk_size; each chunk is an index file (timestamp, face_found, offset and size
+    of the encoded frame, landmarks) and a file with the encoded frames, both memory-mappable .npy files.
+    Landmarks are whatever the eye detector hands over between instances (get_frame_landmarks), e.g. the full
+    FaceMesh mesh, and take far less space than frames; frames can be left out with record_frames=False.
+    Each chunk also stores the capture format it was recorded with, a new chunk starts when the source changes.
+    Each frame is handed to a background thread that encodes it on arrival, so only the encoded bytes of the
+    current chunk are held. At most max_pending_frames raw frames wait for encoding; if the thread falls
+    behind, single frames are dropped rather than slowing down the frame path.
+    """
+    def __init__(
+            self,
+            path: str,
+            record_frames: bool = True,
+            frame_format: str = 'jpg',
+            jpeg_quality: int = 90,
+            chunk_size: int = 300,
+            max_pending_frames: int = 30
+            ) -> None:
+        if frame_format not in FRAME_FORMATS:
+            raise ValueError(f"Unknown frame format {frame_format}, available: {', '.join(FRAME_FORMATS)}.")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.record_frames = record_frames
+        self.frame_format = frame_format
+        self.jpeg_quality = jpeg_quality
+        self.chunk_size = chunk_size
+        self.meta: Dict[str, Any] = {
+            'version': RECORDING_VERSION, 'frame_format': frame_format if record_frames else None, 'chunks': [],
+        }
+        self.source: Dict[str, Any] = dict.fromkeys(SOURCE_KEYS)  # Replaced, never modified, on a source change
+        self.lock = threading.Lock()  # The source is set from the GUI thread, the metadata written by the writer
+        self.dropped_frames = 0
+        self.frames: queue.Queue = queue.Queue(max_pending_frames)
+        # Current chunk, only touched by the writer thread
+        self.rows: List[Tuple[float, bool, int, int, np.ndarray]] = []
+        self.encoded: List[np.ndarray] = []
+        self.offset = 0
+        self.chunk_source = self.source
+        self.n_chunks = 0
+        self.writer = threading.Thread(target=self.write_frames, name='SessionRecorder', daemon=True)
+        self.writer.start()
+
+    def set_source(self, capture_format: Dict[str, Any], landmarks_kind: Optional[str]) -> None:
+        """Describe the camera format and the kind of landmarks ('face_mesh' or 'eyes') of the following frames."""
+        source = {key: capture_format.get(key) for key in SOURCE_KEYS[:-1]}
+        source['landmarks_kind'] = landmarks_kind
+        with self.lock:
+            self.source = source
+
+    def add(self, frame: np.ndarray, timestamp: float, landmarks: np.ndarray, face_found: bool) -> None:
+        """Record a frame. The frame is kept by reference until encoded, it must not be modified afterwards."""
+        with self.lock:
+            source = self.source
+        try:
+            self.frames.put_nowait((
+                frame if self.record_frames else None, timestamp, face_found, np.asarray(landmarks), source,
+            ))
+        except queue.Full:
+            self.dropped_frames += 1
+            instrumentation.count('recording_frames_dropped')
+            if self.dropped_frames == 1:
+                print("Warning: Recording is falling behind, dropping frames.")
+
+    def close(self) -> None:
+        """Write the last chunk and wait for the writer thread."""
+        self.frames.put(None)
+        self.writer.join()
+        if self.dropped_frames:
+            print(f"Recording dropped {self.dropped_frames} frames.")
+
+    def write_frames(self) -> None:
+        while True:
+            item = self.frames.get()
+            try:
+                if item is None:
+                    self.write_chunk()
+                    return
+                self.write_frame(*item)
+            except Exception as e:  # Keep the session running, the recording is best effort
+                print(f"Warning: Could not write recording: {e}")
+
+    def write_frame(
+            self,
+            frame: Optional[np.ndarray],
+            timestamp: float,
+            face_found: bool,
+            landmarks: np.ndarray,
+            source: Dict[str, Any]
+            ) -> None:
+        if self.rows and (source is not self.chunk_source or landmarks.shape != self.rows[0][4].shape):
+            self.write_chunk()  # Camera format or landmarks layout changed, e.g. with another camera or backend
+        self.chunk_source = source
+        size = 0
+        if frame is not None:
+            data = self.encode(frame)
+            self.encoded.append(data)
+            size = len(data)
+        self.rows.append((timestamp, face_found, self.offset, size, landmarks))
+        self.offset += size
+        if len(self.rows) >= self.chunk_size:
+            self.write_chunk()
+
+    def write_chunk(self) -> None:
+        if not self.rows:
+            return
+        rows, encoded = self.rows, self.encoded
+        self.rows, self.encoded, self.offset = [], [], 0
+        dtype = np.dtype([
+            ('timestamp', '<f8'), ('face_found', '?'), ('offset', '<u8'), ('size', '<u4'),
+            ('landmarks', '<f4', rows[0][4].shape),
+        ])
+        index = np.array(rows, dtype=dtype)
+        name = f"chunk_{self.n_chunks:05d}"
+        self.n_chunks += 1
+        np.save(os.path.join(self.path, f"{name}.npy"), index)
+        if encoded:
+            np.save(os.path.join(self.path, f"{name}_frames.npy"), np.concatenate(encoded))
+        with self.lock:
+            self.meta['chunks'].append({
+                'name': name, 'frames': len(rows), 'has_frames': bool(encoded), **self.chunk_source,
+            })
+            meta = copy.deepcopy(self.meta)
+        self.write_meta(meta)
+
+    def encode(self, frame: np.ndarray) -> np.ndarray:
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality] if self.frame_format == 'jpg' else [cv2.IMWRITE_PNG_COMPRESSION, 1]
+        ok, data = cv2.imencode(FRAME_FORMATS[self.frame_format], frame, params)
+        if not ok:
+            raise IOError("Could not encode a frame.")
+        return data.ravel()
+
+    def write_meta(self, meta: Dict[str, Any]) -> None:
+        """Rewritten after every chunk, so an interrupted recording stays readable."""
+        path = os.path.join(self.path, 'meta.json')
+        with open(f"{path}.tmp", 'w') as file:
+            json.dump(meta, file, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+
+class FrameNumbers:
+    """
+    Recording frame numbers of recently decoded frames, looked up by frame identity, so that
+    ReplayLandmarksDetector can match frames to their recorded landmarks even if some are skipped.
+    Frames are held by weak reference only.
+    """
+    def __init__(self, max_size: int = 64) -> None:
+        self.max_size = max_size
+        self.entries: "OrderedDict[int, Tuple[weakref.ref, int]]" = OrderedDict()
+        self.lock = threading.Lock()  # Frames are decoded in the grabber thread and looked up in the processor thread
+
+    def put(self, frame: np.ndarray, number: int) -> None:
+        with self.lock:
+            self.entries[id(frame)] = (weakref.ref(frame), number)
+            self.entries.move_to_end(id(frame))
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def get(self, frame: np.ndarray) -> Optional[int]:
+        """Frame number of a frame decoded from a recording, None for other frames."""
+        with self.lock:
+            entry = self.entries.get(id(frame))
+        if entry is None or entry[0]() is not frame:
+            return None
+        return entry[1]
+
+
+replay_frame_numbers = FrameNumbers()
+
+
+class RecordingReader:
+    """
+    Random access to a recording made by SessionRecorder. Chunk files are memory-mapped, frames are decoded on access.
+    formats holds the capture format of each chunk; version 1 recordings have a single file-wide format.
+    """
+    def __init__(self, path: str) -> None:
+        with open(os.path.join(path, 'meta.json')) as file:
+            self.meta = json.load(file)
+        if self.meta.get('version') not in (1, RECORDING_VERSION):
+            raise ValueError(f"Unsupported recording version {self.meta.get('version')} in {path}.")
+        self.path = path
+        self.indices = []
+        self.frame_data = []
+        self.formats: List[Dict[str, Any]] = []
+        for chunk in sorted(self.meta['chunks'], key=lambda chunk: chunk['name']):
+            self.formats.append({key: chunk.get(key, self.meta.get(key)) for key in SOURCE_KEYS})
+            self.indices.append(np.load(os.path.join(path, f"{chunk['name']}.npy"), mmap_mode='r'))
+            frames_path = os.path.join(path, f"{chunk['name']}_frames.npy")
+            self.frame_data.append(np.load(frames_path, mmap_mode='r') if chunk['has_frames'] else None)
+        self.starts = np.cumsum([0] + [len(index) for index in self.indices])  # First frame number of each chunk
+        if not len(self):
+            raise ValueError(f"Recording {path} has no frames.")
+        self.timestamps = np.concatenate([index['timestamp'] for index in self.indices])
+        self.has_frames = all(data is not None for data in self.frame_data)
+        kinds = {recorded_format['landmarks_kind'] for recorded_format in self.formats}
+        self.landmarks_kind = kinds.pop() if len(kinds) == 1 else None  # None if the chunks disagree
+        self.blank_frames: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return int(self.starts[-1])
+
+    def locate(self, number: int) -> Tuple[int, int]:
+        chunk = int(np.searchsorted(self.starts, number, side='right')) - 1
+        return chunk, number - int(self.starts[chunk])
+
+    def format(self, number: int) -> Dict[str, Any]:
+        """Capture format (width, height, fps, fourcc, landmarks_kind) the frame was recorded with."""
+        return self.formats[self.locate(number)[0]]
+
+    def record(self, number: int) -> np.void:
+        chunk, position = self.locate(number)
+        return self.indices[chunk][position]
+
+    def frame(self, number: int) -> np.ndarray:
+        """Decoded frame, or a blank frame of the recorded size for landmarks-only recordings."""
+        chunk, position = self.locate(number)
+        data = self.frame_data[chunk]
+        if data is None:
+            size = (self.formats[chunk]['height'] or 480, self.formats[chunk]['width'] or 640)
+            if size not in self.blank_frames:
+                self.blank_frames[size] = np.zeros((*size, 3), dtype=np.uint8)
+            frame = self.blank_frames[size].copy()
+        else:
+            record = self.indices[chunk][position]
+            offset = int(record['offset'])
+            frame = cv2.imdecode(np.asarray(data[offset:offset + int(record['size'])]), cv2.IMREAD_COLOR)
+        replay_frame_numbers.put(frame, number)
+        return frame
+
+    def landmarks(self, number: int) -> np.ndarray:
+        return np.array(self.record(number)['landmarks'])
+
+    def face_found(self, number: int) -> bool:
+        return bool(self.record(number)['face_found'])
+
+    def __iter__(self) -> Iterator[Tuple[np.ndarray, float]]:
+        """Yield (frame, timestamp in seconds) pairs, like the offline frame sources."""
+        for number in range(len(self)):
+            yield self.frame(number), float(self.timestamps[number] - self.timestamps[0])
+
+
+def is_recording(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, 'meta.json'))
+
+
+class ReplayCapture:
+    """
+    Stand-in for cv2.VideoCapture that plays back a recording, so the application runs without a camera.
+    With realtime, read() waits until the recorded time of the next frame like a camera would; otherwise
+    frames are returned as fast as they are read. Reopening (e.g. a camera change) restarts the replay.
+    The same frames come out in the same order on every run.
+    """
+    def __init__(self, path: str, realtime: bool = True, loop: bool = False) -> None:
+        self.reader = RecordingReader(path)
+        self.realtime = realtime
+        self.loop = loop
+        self.opened = False
+        self.open()
+
+    def open(self, *args) -> bool:
+        """Restart the replay, the camera index and backend arguments are ignored."""
+        self.position = 0
+        self.start_time: Optional[float] = None
+        self.opened = True
+        return True
+
+    def isOpened(self) -> bool:
+        return self.opened
+
+    def release(self) -> None:
+        self.opened = False
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.opened:
+            return False, None
+        if self.position >= len(self.reader):
+            if not self.loop:
+                return False, None
+            self.position, self.start_time = 0, None
+        if self.realtime:
+            offset = self.reader.timestamps[self.position] - self.reader.timestamps[0]
+            if self.start_time is None:
+                self.start_time = time.monotonic()
+            delay = self.start_time + offset - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        frame = self.reader.frame(self.position)
+        self.position += 1
+        return True, frame
+
+    def get(self, prop: int) -> float:
+        """Capture properties; the format is the one of the last frame read, or of the first before any read."""
+        recorded_format = self.reader.format(min(max(self.position - 1, 0), len(self.reader) - 1))
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(recorded_format['width'] or 640)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(recorded_format['height'] or 480)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(recorded_format['fps'] or 30.0)
+        if prop == cv2.CAP_PROP_FOURCC and recorded_format['fourcc']:
+            return float(cv2.VideoWriter_fourcc(*recorded_format['fourcc']))
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.reader))
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        if prop == cv2.CAP_PROP_POS_MSEC and self.position:
+            return float(self.reader.timestamps[self.position - 1] - self.reader.timestamps[0]) * 1000
+        return 0.0
+
+    def set(self, prop: int, value: float) -> bool:
+        return False  # The recorded format cannot be changed
+
+    def getBackendName(self) -> str:
+        return 'REPLAY'
@@ -0,0 +1,86 @@
+import math
+import os
+import time
+from typing import Optional
+
+
+class AdaptiveScheduler:
+    """
+    Decides which incoming frames go through blink detection, so that detection
+    stays within a CPU budget while keeping a minimum inference rate.
+    Detection runs on every Nth frame; N grows when frames get expensive to process
+    or the machine is loaded, and shrinks again when resources free up.
+    """
+    def __init__(
+            self,
+            cpu_budget: float = 0.5,
+            min_rate: float = 20.0,
+            smoothing: float = 0.1,
+            load_check_interval: float = 2.0
+            ) -> None:
+        self.cpu_budget = cpu_budget  # Fraction of one core that detection may use
+        self.min_rate = min_rate  # Hz, ~100 ms blinks need at least two inferred frames
+        self.smoothing = smoothing  # Weight of the newest sample in the moving averages
+        self.load_check_interval = load_check_interval  # Seconds between system load readings
+        self.reset()
+
+    def reset(self) -> None:
+        self.cost: Optional[float] = None  # Moving average of the processing time per inferred frame
+        self.frame_interval: Optional[float] = None  # Moving average of the time between incoming frames
+        self.last_timestamp: Optional[float] = None
+        self.skip = 1  # Infer every skip-th frame
+        self.counter = 0
+        self.load_factor = 1.0
+        self.last_load_check = -math.inf
+
+    @property
+    def input_rate(self) -> Optional[float]:
+        """Rate of incoming frames in Hz."""
+        return 1 / self.frame_interval if self.frame_interval else None
+
+    @property
+    def effective_rate(self) -> Optional[float]:
+        """Current inference rate in Hz."""
+        return self.input_rate / self.skip if self.input_rate else None
+
+    def average(self, current: Optional[float], sample: float) -> float:
+        return sample if current is None else current + self.smoothing * (sample - current)
+
+    def should_process(self, timestamp: Optional[float] = None) -> bool:
+        """Register an incoming frame and return whether it should be processed."""
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        if self.last_timestamp is not None and timestamp > self.last_timestamp:
+            self.frame_interval = self.average(self.frame_interval, timestamp - self.last_timestamp)
+        self.last_timestamp = timestamp
+
+        self.counter += 1
+        if self.counter >= self.skip:
+            self.counter = 0
+            return True
+        return False
+
+    def record(self, cost: float) -> None:
+        """Register the processing time in seconds of an inferred frame and adapt the rate."""
+        self.cost = self.average(self.cost, cost)
+        self.update_load_factor()
+        if not self.frame_interval or not self.cost:
+            return
+        allowed_rate = self.cpu_budget / (self.load_factor * self.cost)
+        skip = math.ceil(self.input_rate / allowed_rate)
+        max_skip = max(1, math.floor(self.input_rate / self.min_rate))
+        self.skip = min(max(1, skip), max_skip)
+
+    def update_load_factor(self) -> None:
+        """
+        Shrink the budget when the system is overloaded, i.e. the load average exceeds the number of cores.
+        Not available on Windows, where only the processing time is used.
+        """
+        now = time.monotonic()
+        if now - self.last_load_check < self.load_check_interval:
+            return
+        self.last_load_check = now
+        try:
+            load = os.getloadavg()[0] / (os.cpu_count() or 1)
+        except (AttributeError, OSError):
+            return
+        self.load_factor = max(1.0, load)
@@ -1,22 +1,24 @@
 from PyQt6 import QtWidgets, QtGui, QtCore
-from .widgets import CameraSelectionWidget, BlinkTimerWidget, DetectionSensitivityWidget, ButtonLayout   
+from .widgets import CameraSelectionWidget, BlinkTimerWidget, DetectionSensitivityWidget, ButtonLayout, StatsPanel
 from .camera import CameraFeed
+from .instrumentation import instrumentation
 
 
 class ControlWindow(QtWidgets.QWidget):
     """
     Main window for controlling the application.
     """
-    def __init__(self, blur_windows, icon_path:str, change_camera_func, blink_detector, frame_processor):
+    def __init__(self, dimming_controller, icon_path:str, change_camera_func, blink_detector, frame_processor):
         super().__init__()
-        self.blur_windows = blur_windows
+        self.dimming_controller = dimming_controller # Dims the screens until the next blink
         self.change_camera_func = change_camera_func # Function to change the camera feed
         self.blink_detector = blink_detector
         self.frame_processor = frame_processor
+        self.camera_index = 0  # Camera opened at startup
+        self.pending_quantile = None  # Sensitivity chosen before the blink detector was loaded
         self.initUI(icon_path)
         self.setStyle(QtWidgets.QStyleFactory.create('Fusion'))
         self.is_running = False  # track application state
-        self.frame_timer = None
 
     def initUI(self, icon_path:str):
         """
@@ -49,7 +51,7 @@ class ControlWindow(QtWidgets.QWidget):
             common_min_width=common_min_width
             )
         self.layout.addWidget(self.camera_selection_widget)
-        self.camera_selection_widget.camera_combo.currentIndexChanged.connect(self.on_camera_selection_changed) # Connect camera selection change signal
+        self.camera_selection_widget.camera_combo.activated.connect(self.on_camera_selection_changed) # Only user selections, not cameras added by discovery
         self.camera_selection_widget.start()  # Initially disable camera selection
 
         # Blink Timer setting layout
@@ -72,6 +74,7 @@ class ControlWindow(QtWidgets.QWidget):
 
         # Add camera live feed
         self.camera_feed = CameraFeed(parent=None)
+        self.camera_feed.resized.connect(self.update_preview_size)
         self.layout.addWidget(self.camera_feed, stretch=3)
 
         # Description label
@@ -91,6 +94,11 @@ class ControlWindow(QtWidgets.QWidget):
         self.layout.addLayout(self.button_layout)
         self.button_layout.upon_start() #Initially disable buttons until camera is live
 
+        # Pipeline stats, only when instrumentation is enabled (verbose)
+        self.stats_panel = StatsPanel(parent=None) if instrumentation.enabled else None
+        if self.stats_panel is not None:
+            self.layout.addWidget(self.stats_panel)
+
         self.setLayout(self.layout)
         self.update_styles()
         self.show()
@@ -119,10 +127,7 @@ class ControlWindow(QtWidgets.QWidget):
         Behavior when the start button is pressed.
         """
         self.is_running = True # update application state
-        reset_all_windows(self.blur_windows)  # Reset all windows before starting
-        for window in self.blur_windows:
-            window.showFullScreen()
-            window.start_opacity()  # Start the blurring process
+        self.dimming_controller.start()  # Start the blurring process
 
         # Disable Start button, camera switching, blink timer and detection sensitivity changes
         self.camera_selection_widget.start()
@@ -135,8 +140,7 @@ class ControlWindow(QtWidgets.QWidget):
         Behavior when the stop button is pressed.
         """
         self.is_running = False # update application state
-        for window in self.blur_windows:
-            window.hide()
+        self.dimming_controller.stop()
 
         # Re-enable the start button, restore its original appearance, and update its text
         self.camera_selection_widget.stop()
@@ -160,6 +164,22 @@ class ControlWindow(QtWidgets.QWidget):
         self.update_styles()
         super().resizeEvent(event)
 
+    def changeEvent(self, event):
+        """
+        Pause the preview while the window is minimized.
+        """
+        if event.type() == QtCore.QEvent.Type.WindowStateChange:
+            self.update_preview_enabled()
+        super().changeEvent(event)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_preview_enabled()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_preview_enabled()
+
     def closeEvent(self, event):
         """
         Behavior when the window is closed. 
@@ -170,22 +190,46 @@ class ControlWindow(QtWidgets.QWidget):
     
     def on_camera_selection_changed(self, index):
         """Handle camera selection change."""
-        self.change_camera_func(index)
+        camera_index = self.camera_selection_widget.camera_combo.itemData(index)
+        if camera_index == self.camera_index:
+            return  # Same camera selected again
+        self.camera_index = camera_index
+        self.change_camera_func(camera_index)
         self.frame_processor.update_blink_persist_frames() #update blink persist frames based on new camera FPS
 
-    def update_camera_feed(self, frame):
+    def update_camera_feed(self, q_image):
+        """
+        Update the camera feed with the new preview image.
+        """
+        self.camera_feed.update_camera_feed(q_image)
+
+    def update_preview_size(self, width, height):
+        """
+        Let the frame processor render previews at the size of the camera feed.
+        """
+        if self.frame_processor:
+            self.frame_processor.set_preview_size(width, height)
+
+    def update_preview_enabled(self):
+        """
+        Only render previews while the window is visible and not minimized.
+        """
+        if self.frame_processor:
+            self.frame_processor.set_preview_enabled(self.isVisible() and not self.isMinimized())
+
+    def on_frame_processed(self, is_blink, eye_landmarks, q_image):
         """
-        Update the camera feed with the new frame.
+        Handle the results of a processed frame sent by the frame processor thread.
         """
-        self.camera_feed.update_camera_feed(frame)
+        self.update_camera_feed(q_image)
+        self.frame_processor.preview_consumed()
 
     def update_initial_delay(self, value):
         """
         Update the initial delay for the blurring process.
         """
         self.initial_delay_seconds = value
-        for window in self.blur_windows:
-            window.initial_delay_seconds = value 
+        self.dimming_controller.initial_delay_seconds = value
 
     def update_quantile(self, value):
         """
@@ -193,99 +237,143 @@ class ControlWindow(QtWidgets.QWidget):
         """
         quantile_values = [0.99, 0.975, 0.96, 0.945, 0.93]
         selected_quantile = quantile_values[value - 1]
+        if self.blink_detector is None:
+            self.pending_quantile = selected_quantile
+            return
         self.blink_detector.module.calibrator.quantile = selected_quantile #affects detector as it is passed by reference
 
+    def set_blink_detector(self, blink_detector):
+        """Use the blink detector once it is loaded in the background, applying a sensitivity chosen meanwhile."""
+        self.blink_detector = blink_detector
+        if self.pending_quantile is not None:
+            blink_detector.module.calibrator.quantile = self.pending_quantile
+            self.pending_quantile = None
+
     def disable_ui_components(self):
         """Disable UI components during camera change."""
         self.camera_selection_widget.start()  # Disable camera selection
         self.button_layout.upon_start()  # Disable Start/Stop buttons
-        if self.frame_timer:
-            self.frame_timer.stop()
+        if self.frame_processor:
+            self.frame_processor.pause()
+            self.frame_processor.reset()  # Frames of the previous camera must not count as changes
 
     def enable_ui_components(self):
         """Enable UI components after camera change."""
         self.camera_selection_widget.stop()
         self.button_layout.stop()
-        if self.frame_timer:
-            self.frame_timer.start(16)  # Restart frame processing
+        if self.frame_processor:
+            self.frame_processor.resume()  # Restart frame processing
     
     
 class BlurWindow(QtWidgets.QWidget):
     """
     Window that blurs the screen to create blinking awareness.
+    It is a plain black window dimmed through its window opacity, so changing the opacity costs no repaint.
+    Platforms without window opacity (e.g. Wayland) repaint it with a translucent fill instead.
     """
-    def __init__(self, screen):
+    def __init__(self, screen, use_window_opacity:bool=True):
         super().__init__()
         self.setWindowFlags(QtCore.Qt.WindowType.FramelessWindowHint | QtCore.Qt.WindowType.WindowStaysOnTopHint | QtCore.Qt.WindowType.ToolTip)
         self.setWindowFlags(self.windowFlags() | QtCore.Qt.WindowType.WindowTransparentForInput)
-        self.setAttribute(QtCore.Qt.WidgetAttribute.WA_TranslucentBackground)
         self.setAttribute(QtCore.Qt.WidgetAttribute.WA_TransparentForMouseEvents, True)
+        self.use_window_opacity = use_window_opacity
+        if use_window_opacity:
+            self.setAttribute(QtCore.Qt.WidgetAttribute.WA_OpaquePaintEvent)  # Painted once per expose, black
+            self.setWindowOpacity(0.0)
+        else:
+            self.setAttribute(QtCore.Qt.WidgetAttribute.WA_TranslucentBackground)
 
         # Get screen size
         self.setGeometry(screen.geometry())
+        self.opacity_level = 0  # Alpha of the black overlay, 0-255
 
-        # Timer for gradual blur
-        self.timer = QtCore.QTimer()
-        self.timer.timeout.connect(self.increase_opacity)
-
-        # Opacity settings
-        self.opacity_level = 0
-        self.max_opacity_level = 155  # Maximum opacity level
-        self.opacity_step = 3  # Opacity increment per step
-
-        # Timer for initial delay
-        self.initial_delay_timer = QtCore.QTimer()
-        self.initial_delay_timer.timeout.connect(self.start_opacity_increase)
-        self.initial_delay_seconds = 5  # Delay in seconds before opacity starts increasing
-
-    def start_opacity(self):
-        """
-        Behavior when the application starts.
-        """
-        self.reset_opacity()  # Ensure opacity is reset before starting
-        self.initial_delay_timer.start(self.initial_delay_seconds * 1000)  # Start the initial delay timer
-    
-    def start_opacity_increase(self):
-        """
-        Start the opacity increase timer.
-        """
-        self.initial_delay_timer.stop()
-        self.timer.start(50)  # Start the opacity increase timer
-
-    @QtCore.pyqtSlot()
-    def reset_opacity(self):
-        """
-        Reset the opacity of the blur window.
-        """
-        self.opacity_level = 0
-        self.timer.stop()  # Stop the opacity increase timer
-        self.initial_delay_timer.start(self.initial_delay_seconds * 1000)  # Restart the initial delay timer
-        self.update()
+    def set_opacity_level(self, level:int):
+        self.opacity_level = level
+        if self.use_window_opacity:
+            self.setWindowOpacity(level / 255)
+        else:
+            self.update()
 
     def paintEvent(self, event):
         """
         Paint the blur window.
         """
-        painter = QtGui.QPainter(self)
-        painter.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
-        painter.fillRect(self.rect(), QtGui.QColor(0, 0, 0, self.opacity_level))
-        painter.end()
-    
-    def increase_opacity(self): 
-        """
-        Increase the opacity of the blur window.
-        """
-        if self.opacity_level < self.max_opacity_level:
-            self.opacity_level += self.opacity_step
-            self.update()
-        else:
-            self.timer.stop()
+        with instrumentation.stage('blur_paint'):
+            painter = QtGui.QPainter(self)
+            alpha = 255 if self.use_window_opacity else self.opacity_level
+            painter.fillRect(event.rect(), QtGui.QColor(0, 0, 0, alpha))
+            painter.end()
 
 
-def reset_all_windows(blur_windows):  
+class DimmingController(QtCore.QObject):
     """
-    Reset the opacity of all blur windows.
+    Dims all blur windows together from a single timer.
+    After a blink the screens stay clear for initial_delay_seconds, then darken by opacity_step every
+    step_interval_ms until max_opacity_level. The timer is stopped while the screens are clear and waiting
+    or fully dimmed, so nothing runs between blinks once the maximum is reached.
     """
-    for window in blur_windows:
-        # Use invokeMethod to ensure the method is called in the correct thread
-        QtCore.QMetaObject.invokeMethod(window, "reset_opacity", QtCore.Qt.ConnectionType.QueuedConnection)
\ No newline at end of file
+    def __init__(self, blur_windows, initial_delay_seconds:int=5, max_opacity_level:int=155, opacity_step:int=3, step_interval_ms:int=50):
+        super().__init__()
+        self.blur_windows = blur_windows
+        self.initial_delay_seconds = initial_delay_seconds  # Delay in seconds before opacity starts increasing
+        self.max_opacity_level = max_opacity_level  # Maximum opacity level
+        self.opacity_step = opacity_step  # Opacity increment per step
+        self.step_interval_ms = step_interval_ms
+        self.opacity_level = 0
+        self.running = False
+        self.timer = QtCore.QTimer(self)  # Single clock: the initial delay, then the opacity steps
+        self.timer.timeout.connect(self.on_timeout)
+        self.dimming = False  # Whether the timer is stepping the opacity rather than waiting for the delay
+
+    def start(self):
+        """Show the blur windows and start the dimming cycle."""
+        self.running = True
+        self.set_opacity_level(0)
+        for window in self.blur_windows:
+            window.showFullScreen()
+        self.restart_delay()
+
+    def stop(self):
+        """Hide the blur windows and stop the clock."""
+        self.running = False
+        self.timer.stop()
+        for window in self.blur_windows:
+            window.hide()
+
+    def reset(self):
+        """
+        Reset the opacity of the blur windows and restart the initial delay.
+        Must be called from the GUI thread.
+        """
+        if not self.running:
+            return
+        self.set_opacity_level(0)
+        self.restart_delay()
+
+    def on_blink_event(self, event):
+        """Keep the screens clear from the start of a blink, the initial delay runs from its end."""
+        if event.kind == 'start' and self.running:
+            self.set_opacity_level(0)
+            self.timer.stop()
+        else:
+            self.reset()
+
+    def restart_delay(self):
+        self.dimming = False
+        self.timer.start(self.initial_delay_seconds * 1000)
+
+    def on_timeout(self):
+        if not self.dimming:
+            self.dimming = True
+            self.timer.start(self.step_interval_ms)  # Delay over, start stepping
+        self.set_opacity_level(min(self.opacity_level + self.opacity_step, self.max_opacity_level))
+        instrumentation.count('blur_steps')
+        if self.opacity_level >= self.max_opacity_level:
+            self.timer.stop()  # Fully dimmed, idle until the next reset
+
+    def set_opacity_level(self, level:int):
+        if level == self.opacity_level:
+            return
+        self.opacity_level = level
+        for window in self.blur_windows:
+            window.set_opacity_level(level)
@@ -0,0 +1,64 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+PROFILE_STARTUP_FLAG = '--profile-startup'
+
+
+class StartupProfiler:
+    """
+    Records how long each startup phase takes and prints the breakdown once the camera is live.
+    Entry scripts import this module first, so the total covers the imports as well.
+    Phases may run in different threads, e.g. the camera opens while the GUI is set up.
+    """
+    def __init__(self) -> None:
+        self.enabled = False
+        self.start = time.perf_counter()
+        self.last_mark = self.start
+        self.phases: List[Tuple[str, float]] = []
+        self.lock = threading.Lock()
+        self.reported = False
+
+    def enable_from_argv(self, argv: List[str] = sys.argv) -> bool:
+        """Enable profiling if the flag is in argv, removing it so that Hydra does not read it as an override."""
+        if PROFILE_STARTUP_FLAG in argv:
+            argv.remove(PROFILE_STARTUP_FLAG)
+            self.enabled = True
+        return self.enabled
+
+    def add(self, name: str, seconds: float) -> None:
+        if self.enabled:
+            with self.lock:
+                self.phases.append((name, seconds))
+
+    def mark(self, name: str) -> None:
+        """Record the time since the previous mark (or the start) as a phase, for sequential steps of the main thread."""
+        now = time.perf_counter()
+        self.add(name, now - self.last_mark)
+        self.last_mark = now
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def report(self) -> None:
+        """Print the phases in completion order and the total since launch, once."""
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        total = time.perf_counter() - self.start
+        with self.lock:
+            phases = list(self.phases)
+        print("Startup profile:")
+        for name, seconds in phases:
+            print(f"  {name:<28}{seconds * 1000:8.1f} ms")
+        print(f"  {'total until camera is live':<28}{total * 1000:8.1f} ms")
+
+
+startup_profiler = StartupProfiler()
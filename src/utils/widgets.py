@@ -1,5 +1,6 @@
 from PyQt6 import QtWidgets, QtGui, QtCore
-import cv2
+from .camera import CameraDiscovery
+from .instrumentation import instrumentation
 
 class CameraSelectionWidget(QtWidgets.QWidget):
     """
@@ -12,7 +13,14 @@ class CameraSelectionWidget(QtWidgets.QWidget):
         self.camera_label.setStyleSheet("font-size: 16px; color: #2E86C1;")
         self.layout.addWidget(self.camera_label, 3)
         self.camera_combo = QtWidgets.QComboBox()
-        self.camera_combo.addItems(self.get_available_cameras())
+        # Default (first) camera is initialized in main.py, the others are added as they are discovered
+        self.add_camera(0)
+        self.camera_discovery = CameraDiscovery()
+        for index, name in self.camera_discovery.cached_cameras():
+            self.add_camera(index, name)
+        self.camera_discovery.camera_found.connect(self.add_camera)
+        self.camera_discovery.finished.connect(self.on_discovery_finished)
+        self.camera_discovery.start()
         self.camera_combo.setStyleSheet(f"""
             QComboBox {{
                 font-size: 14px;
@@ -44,33 +52,27 @@ class CameraSelectionWidget(QtWidgets.QWidget):
             }}
         """)
     
-    def get_available_cameras(self):
+    def add_camera(self, index, name=''):
         """
-        Get a list of available cameras
-        Note: First camera is initialized in main.py
+        Add a camera to the list, keeping it sorted by index, or update its name if already listed.
+        Items store their camera index, which differs from their position when an index is missing.
         """
-        available_cameras = []
+        text = f"Camera {index}: {name}" if name else f"Camera {index}"
+        position = self.camera_combo.findData(index)
+        if position >= 0:
+            self.camera_combo.setItemText(position, text)
+            return
+        position = 0
+        while position < self.camera_combo.count() and self.camera_combo.itemData(position) < index:
+            position += 1
+        self.camera_combo.insertItem(position, text, index)
 
-        #Add default (first) camera
-        available_cameras.append("Camera 0")
-
-        # We assume that users have not more than 5 cameras
-        for index in range(1,5):  
-            #try:
-            cap = cv2.VideoCapture(index)  
-            if cap.isOpened():
-                ret, _ = cap.read()
-                if ret:
-                    available_cameras.append(f"Camera {index}")
-                cap.release()
-            # except:
-            #     continue
-        
-        # If no cameras found, raise an error and exit
-        if not available_cameras:
-            raise RuntimeError("No camera found. Please connect a camera and try again.")
-        
-        return available_cameras
+    def on_discovery_finished(self, indices):
+        """Drop the cached cameras that were not found again, except the default and the selected one."""
+        for position in reversed(range(self.camera_combo.count())):
+            index = self.camera_combo.itemData(position)
+            if index != 0 and index not in indices and position != self.camera_combo.currentIndex():
+                self.camera_combo.removeItem(position)
 
 
 class BlinkTimerWidget(QtWidgets.QWidget):
@@ -229,6 +231,28 @@ class DetectionSensitivityWidget(QtWidgets.QWidget):
             self.connect_func(value)
 
 
+class StatsPanel(QtWidgets.QWidget):
+    """
+    Panel showing the stage timings and counters of the instrumentation, refreshed every second.
+    """
+    def __init__(self, parent=None, refresh_ms:int=1000):
+        super().__init__(parent)
+        self.layout = QtWidgets.QVBoxLayout()
+        self.layout.setContentsMargins(0, 0, 0, 0)
+        self.stats_label = QtWidgets.QLabel("Collecting stats...")
+        self.stats_label.setStyleSheet("font-family: monospace; font-size: 12px; color: #5D6D7E;")
+        self.stats_label.setTextInteractionFlags(QtCore.Qt.TextInteractionFlag.TextSelectableByMouse)
+        self.layout.addWidget(self.stats_label)
+        self.setLayout(self.layout)
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(refresh_ms)
+
+    def refresh(self):
+        if self.isVisible():
+            self.stats_label.setText(instrumentation.format())
+
+
 class ButtonLayout(QtWidgets.QHBoxLayout):
     """
     Layout for the start and stop buttons.